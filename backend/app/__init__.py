@@ -6,14 +6,44 @@ def create_app(config_name='development'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    from app.utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
     db.init_app(app)
     jwt.init_app(app)
     cors.init_app(app, origins=app.config['CORS_ORIGINS'])
-    socketio.init_app(app)
+    socketio.init_app(
+        app,
+        cors_allowed_origins=app.config['SOCKETIO_CORS_ALLOWED_ORIGINS'],
+        message_queue=app.config['SOCKETIO_MESSAGE_QUEUE']
+    )
     migrate.init_app(app, db)
     
+    if app.config['TRUSTED_PROXY_COUNT']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        count = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=count, x_proto=count)
+    
     with app.app_context():
+        from app.utils.sqlite_pragmas import configure_sqlite
+        configure_sqlite(db.engine, app.config['SQLITE_BUSY_TIMEOUT_MS'])
+        
+        from app.utils.query_profiler import init_query_profiler
+        init_query_profiler(app, db.engine)
+        
         from app import models
+        from app.services import transaction_aggregates  # registers ledger write hooks
+        from app.services import realtime  # registers Socket.IO handlers and post-commit pushes
+        
+        from app.services.monitoring import init_monitoring
+        init_monitoring(app, db.engine)
+        from app.services import throttling  # registers lockout metrics
+        
+        from app.services.token_revocation import init_token_revocation
+        init_token_revocation(jwt)
+    
+    from app.commands import register_commands
+    register_commands(app)
     
     from app.blueprints.auth import auth_bp
     from app.blueprints.wallet import wallet_bp
@@ -26,6 +56,7 @@ def create_app(config_name='development'):
     from app.blueprints.isic import isic_bp
     from app.blueprints.isic_upload import isic_upload_bp
     from app.blueprints.expected_payments import expected_payments_bp
+    from app.blueprints.metrics import metrics_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(wallet_bp, url_prefix='/api/wallet')
@@ -38,6 +69,10 @@ def create_app(config_name='development'):
     app.register_blueprint(isic_bp, url_prefix='/api/isic')
     app.register_blueprint(isic_upload_bp)
     app.register_blueprint(expected_payments_bp, url_prefix='/api/expected-payments')
+    if app.config['METRICS_ENABLED']:
+        app.register_blueprint(metrics_bp)
+        if not app.config['METRICS_TOKEN'] and not (app.debug or app.testing):
+            app.logger.warning('METRICS_TOKEN is not set; /metrics will reject every request')
     
     @app.route('/api/health')
     def health_check():
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import decode_token, jwt_required, get_jwt, get_jwt_identity
 from app.extensions import db
 from app.models import User, Wallet
+from app.services import throttling, token_revocation, user_cache
+from app.utils.auth_claims import access_token_for, claims_required, current_claims, tokens_for
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -50,8 +52,7 @@ def register():
     
     db.session.commit()
     
-    access_token = create_access_token(identity=str(user.id))
-    refresh_token = create_refresh_token(identity=str(user.id))
+    access_token, refresh_token = tokens_for(user, wallet)
     
     return jsonify({
         'message': 'User registered successfully',
@@ -68,23 +69,37 @@ def login():
         current_app.logger.warning(f"Login attempt with missing credentials - data: {bool(data)}, email: {bool(data.get('email') if data else False)}, password: {bool(data.get('password') if data else False)}")
         return jsonify({'error': 'Missing email or password'}), 400
     
+    if not isinstance(data['email'], str) or not isinstance(data['password'], str):
+        return jsonify({'error': 'Email and password must be strings'}), 400
+    
+    retry_after = throttling.login_retry_after(data['email'])
+    if retry_after:
+        current_app.logger.warning(f"Throttled login attempt for: {data['email']}")
+        return throttling.too_many_attempts(retry_after)
+    
     user = User.query.filter_by(email=data['email']).first()
     
     if not user:
         current_app.logger.warning(f"Login attempt for non-existent user: {data['email']}")
+        throttling.record_login_failure(data['email'])
         return jsonify({'error': 'Invalid email or password'}), 401
 
     if not user.check_password(data['password']):
         current_app.logger.warning(f"Failed login attempt with invalid password for user: {data['email']}")
+        throttling.record_login_failure(data['email'])
         return jsonify({'error': 'Invalid email or password'}), 401
     
+    throttling.reset_login(data['email'])
+    
     if not user.is_active:
         current_app.logger.warning(f"Login attempt for deactivated account: {data['email']}")
         return jsonify({'error': 'Account is deactivated'}), 403
     
+    if user in db.session.dirty:
+        db.session.commit()  # persist a password hash upgraded by check_password
+    
     current_app.logger.info(f"Successful login for user: {user.email}")
-    access_token = create_access_token(identity=str(user.id))
-    refresh_token = create_refresh_token(identity=str(user.id))
+    access_token, refresh_token = tokens_for(user)
     
     return jsonify({
         'message': 'Login successful',
@@ -93,6 +108,21 @@ def login():
         'refresh_token': refresh_token
     }), 200
 
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    user_id = int(get_jwt_identity())
+    user = User.query.get(user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    if not user.is_active:
+        return jsonify({'error': 'Account is deactivated'}), 403
+    
+    # Claims are re-read from the user, so changes since the last token are picked up here
+    return jsonify({'access_token': access_token_for(user)}), 200
+
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
@@ -148,8 +178,19 @@ def update_user_profile():
 @jwt_required()
 def logout():
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    
+    token_revocation.revoke(get_jwt())
+    
+    # Revoke the refresh token too when the client sends it
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            refresh_claims = decode_token(refresh_token)
+        except Exception:
+            refresh_claims = None
+        if refresh_claims and refresh_claims.get('type') == 'refresh' and refresh_claims['sub'] == str(user_id):
+            token_revocation.revoke(refresh_claims)
+    
+    user = user_cache.get_summary(user_id)
     if user:
         current_app.logger.info(f"User logged out: {user.email}")
     
@@ -181,7 +222,8 @@ def set_pin():
     db.session.commit()
     
     current_app.logger.info(f"Initial PIN set for user: {user.email}")
-    return jsonify({'message': 'PIN set successfully'}), 200
+    # pin_set changed, so hand back a token whose claims say so
+    return jsonify({'message': 'PIN set successfully', 'access_token': access_token_for(user)}), 200
 
 @auth_bp.route('/verify-pin', methods=['POST'])
 @jwt_required()
@@ -195,7 +237,13 @@ def verify_pin():
     data = request.get_json()
     pin = data.get('pin')
     
-    if user.check_pin(pin):
+    valid, retry_after = throttling.check_pin(user, pin)
+    if retry_after:
+        return throttling.too_many_attempts(retry_after)
+    
+    if valid:
+        if user in db.session.dirty:
+            db.session.commit()  # persist a PIN hash upgraded by check_pin
         return jsonify({'valid': True}), 200
     else:
         return jsonify({'valid': False}), 400
@@ -217,8 +265,13 @@ def change_pin():
     if not current_password:
         return jsonify({'error': 'Current password is required'}), 400
     
+    retry_after = throttling.login_retry_after(user.email)
+    if retry_after:
+        return throttling.too_many_attempts(retry_after)
+    
     if not user.check_password(current_password):
         current_app.logger.warning(f"Failed PIN change attempt with invalid password for user: {user.email}")
+        throttling.record_login_failure(user.email)
         return jsonify({'error': 'Invalid password'}), 401
     
     if not new_pin or len(str(new_pin)) != 4 or not str(new_pin).isdigit():
@@ -237,16 +290,30 @@ def change_pin():
     return jsonify({'message': 'PIN changed successfully'}), 200
 
 @auth_bp.route('/check-default-pin', methods=['GET'])
-@jwt_required()
+@claims_required()
 def check_default_pin():
     user_id = int(get_jwt_identity())
+    if not current_claims()['pin_set']:
+        return jsonify({'has_pin': False, 'is_default_pin': False}), 200
+    
+    summary = user_cache.get_summary(user_id)
+    
+    if summary and (not summary.has_pin or summary.pin_is_default is not None):
+        return jsonify({
+            'has_pin': summary.has_pin,
+            'is_default_pin': summary.has_pin and summary.pin_is_default
+        }), 200
+    
+    # Unknown user, or a PIN set before pin_is_default existed: resolve on the full row
     user = User.query.get(user_id)
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    has_default_pin = user.check_pin('1234')
+    has_default_pin = user.has_default_pin()
     has_pin = user.pin_hash is not None
+    if user in db.session.dirty:
+        db.session.commit()
     
     return jsonify({
         'has_pin': has_pin,
@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
 from app.extensions import db
+from app.services import card_numbers, ledger
+from app.utils.etag import conditional, row_version
+from app.utils.idempotency import idempotent
 from app.models import VirtualCard, Subscription, Wallet, Transaction
-from datetime import datetime, timedelta
+from datetime import datetime
 
 cards_bp = Blueprint('cards', __name__)
 
@@ -73,29 +78,49 @@ SUBSCRIPTION_CATALOG = [
     },
 ]
 
+def _cards_version(user_id):
+    user_cards = VirtualCard.user_id == user_id
+    return [
+        *row_version(VirtualCard, user_cards),
+        *row_version(Subscription, Subscription.card_id.in_(select(VirtualCard.id).where(user_cards)))
+    ]
+
 @cards_bp.route('', methods=['GET'], strict_slashes=False)
 @jwt_required()
+@conditional(_cards_version)
 def get_cards():
     user_id = int(get_jwt_identity())
     card_purpose = request.args.get('card_purpose')  # 'payment', 'budget', or None (all)
     
-    query = VirtualCard.query.filter_by(user_id=user_id)
+    query = VirtualCard.query.options(selectinload(VirtualCard.subscription_list)).filter_by(user_id=user_id)
     if card_purpose:
         query = query.filter_by(card_purpose=card_purpose)
     
     cards = query.order_by(VirtualCard.created_at.desc()).all()
     
-    # Calculate summary for budget cards
-    budget_cards = [c for c in cards if c.card_purpose == 'budget']
-    subscription_cards = [c for c in cards if c.card_purpose == 'subscription']
-    total_allocated = sum(float(c.allocated_amount) for c in budget_cards)
-    total_spent = sum(float(c.spent_amount) for c in budget_cards)
+    # Budget and subscription totals per card purpose in one grouped query
+    monthly_subscriptions = select(func.sum(Subscription.amount)).where(
+        Subscription.card_id == VirtualCard.id,
+        Subscription.is_active.is_(True),
+        Subscription.billing_cycle == 'monthly'
+    ).correlate(VirtualCard).scalar_subquery()
+    
+    summary_query = select(
+        VirtualCard.card_purpose,
+        func.count(VirtualCard.id).label('card_count'),
+        func.sum(VirtualCard.allocated_amount).label('allocated'),
+        func.sum(VirtualCard.spent_amount).label('spent'),
+        func.sum(monthly_subscriptions).label('monthly_subscriptions')
+    ).where(VirtualCard.user_id == user_id).group_by(VirtualCard.card_purpose)
+    if card_purpose:
+        summary_query = summary_query.where(VirtualCard.card_purpose == card_purpose)
     
-    # Calculate subscription summary
-    total_monthly_subscription = sum(
-        sum(float(sub.amount) for sub in c.subscriptions.filter_by(is_active=True, billing_cycle='monthly').all())
-        for c in subscription_cards
-    )
+    totals = {row.card_purpose: row for row in db.session.execute(summary_query)}
+    budget = totals.get('budget')
+    subscription = totals.get('subscription')
+    total_allocated = float(budget.allocated or 0) if budget else 0
+    total_spent = float(budget.spent or 0) if budget else 0
+    total_monthly_subscription = float(subscription.monthly_subscriptions or 0) if subscription else 0
     
     return jsonify({
         'cards': [card.to_dict() for card in cards],
@@ -104,9 +129,9 @@ def get_cards():
             'total_spent': total_spent,
             'total_remaining': total_allocated - total_spent,
             'card_count': len(cards),
-            'payment_card_count': len([c for c in cards if c.card_purpose == 'payment']),
-            'budget_card_count': len(budget_cards),
-            'subscription_card_count': len(subscription_cards),
+            'payment_card_count': totals['payment'].card_count if 'payment' in totals else 0,
+            'budget_card_count': totals['budget'].card_count if 'budget' in totals else 0,
+            'subscription_card_count': totals['subscription'].card_count if 'subscription' in totals else 0,
             'total_monthly_subscription': total_monthly_subscription
         }
     }), 200
@@ -170,9 +195,9 @@ def get_or_create_default_cards():
             card_purpose='payment',
             card_type='standard',
             card_name='Standard Digital Card',
-            card_number=VirtualCard.generate_card_number(),
-            cvv=VirtualCard.generate_cvv(),
-            expiry_date=(datetime.utcnow() + timedelta(days=1095)).date(),
+            card_number=card_numbers.next_card_number(),
+            cvv=card_numbers.generate_cvv(),
+            expiry_date=card_numbers.default_expiry_date(),
             is_frozen=False
         )
         db.session.add(standard_card)
@@ -185,9 +210,9 @@ def get_or_create_default_cards():
             card_purpose='payment',
             card_type='virtual',
             card_name='One-Time Card',
-            card_number=VirtualCard.generate_card_number(),
-            cvv=VirtualCard.generate_cvv(),
-            expiry_date=(datetime.utcnow() + timedelta(days=1095)).date(),
+            card_number=card_numbers.next_card_number(),
+            cvv=card_numbers.generate_cvv(),
+            expiry_date=card_numbers.default_expiry_date(),
             is_frozen=False
         )
         db.session.add(one_time_card)
@@ -244,9 +269,9 @@ def create_card():
             card_purpose='payment',
             card_type=data.get('card_type', 'standard'),
             card_name=card_name,
-            card_number=VirtualCard.generate_card_number(),
-            cvv=VirtualCard.generate_cvv(),
-            expiry_date=(datetime.utcnow() + timedelta(days=1095)).date(),
+            card_number=card_numbers.next_card_number(),
+            cvv=card_numbers.generate_cvv(),
+            expiry_date=card_numbers.default_expiry_date(),
             spending_limit=data.get('spending_limit')
         )
     elif card_purpose == 'budget':
@@ -380,6 +405,7 @@ def add_subscription(card_id):
 
 @cards_bp.route('/<int:card_id>/allocate', methods=['POST'])
 @jwt_required()
+@idempotent
 def allocate_funds(card_id):
     """Allocate funds from wallet to budget card"""
     user_id = int(get_jwt_identity())
@@ -420,6 +446,7 @@ def allocate_funds(card_id):
             completed_at=datetime.utcnow()
         )
         db.session.add(transaction)
+        ledger.move('budget_allocation', ledger.wallet_account(wallet), ledger.budget_card_account(card), amount_decimal, source_transaction=transaction)
         db.session.commit()
         
         return jsonify({
@@ -472,6 +499,7 @@ def spend_from_card(card_id):
             completed_at=datetime.utcnow()
         )
         db.session.add(transaction)
+        ledger.move('budget_expense', ledger.budget_card_account(card), ledger.EXTERNAL_ACCOUNT, amount_decimal, source_transaction=transaction)
         db.session.commit()
         
         return jsonify({
@@ -534,6 +562,7 @@ def withdraw_from_card(card_id):
             completed_at=datetime.utcnow()
         )
         db.session.add(transaction)
+        ledger.move('budget_withdrawal', ledger.budget_card_account(card), ledger.wallet_account(wallet), amount_decimal, destination_transaction=transaction)
         db.session.commit()
         
         return jsonify({
@@ -548,6 +577,7 @@ def withdraw_from_card(card_id):
 
 @cards_bp.route('/<int:card_id>/pay', methods=['POST'])
 @jwt_required()
+@idempotent
 def process_payment(card_id):
     """Process a payment using a payment card"""
     user_id = int(get_jwt_identity())
@@ -613,6 +643,7 @@ def process_payment(card_id):
             completed_at=datetime.utcnow()
         )
         db.session.add(transaction)
+        ledger.move('card_payment', ledger.wallet_account(wallet), ledger.EXTERNAL_ACCOUNT, amount_decimal, source_transaction=transaction)
         db.session.commit()
         
         return jsonify({
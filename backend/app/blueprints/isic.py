@@ -1,10 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
 from app.models.user import User
 from app.models.isic_profile import ISICProfile
 from app.models.merchant import Merchant
 from app.models.discount_application import DiscountApplication
+from app.services import merchant_catalog
 from datetime import datetime, date
 import hashlib
 
@@ -121,17 +122,13 @@ def unlink_profile():
 def get_merchants():
     category = request.args.get('category')
     
-    query = Merchant.query.filter_by(is_active=True)
+    # Served from the in-process catalog; merchant writes bump its version
+    merchants = merchant_catalog.merchants_slice(category)
     
-    if category:
-        query = query.filter_by(category=category)
-    
-    merchants = query.all()
-    
-    return jsonify({
-        'merchants': [merchant.to_dict() for merchant in merchants],
-        'count': len(merchants)
-    }), 200
+    response = current_app.response_class(merchants.body, mimetype='application/json')
+    response.set_etag(merchants.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 @isic_bp.route('/merchants/<int:merchant_id>', methods=['GET'])
 @jwt_required()
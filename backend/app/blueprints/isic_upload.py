@@ -1,13 +1,13 @@
 import base64
 import io
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models.user import User
 from app.models.virtual_card import VirtualCard
 from app.models.isic_card_metadata import ISICCardMetadata
 from app.models.isic_profile import ISICProfile
+from app.utils.auth_claims import claims_required
 
 isic_upload_bp = Blueprint('isic_upload', __name__, url_prefix='/api/isic')
 
@@ -70,9 +70,9 @@ def upload_card_metadata():
                     screenshot_base64 = f"data:image/png;base64,{screenshot_base64}"
                 
                 screenshot_url = screenshot_base64
-                print(f"Screenshot saved to database (base64)")
+                current_app.logger.info("Screenshot saved to database (base64)")
             except Exception as e:
-                print(f"Error processing screenshot: {e}")
+                current_app.logger.exception(f"Error processing screenshot: {e}")
                 screenshot_url = None
         
         existing_user_metadata = ISICCardMetadata.query.filter_by(
@@ -90,7 +90,7 @@ def upload_card_metadata():
                 existing_user_metadata.screenshot_url = screenshot_url
             existing_user_metadata.updated_at = datetime.utcnow()
             metadata = existing_user_metadata
-            print(f"Updated existing metadata for user {current_user_id}")
+            current_app.logger.info(f"Updated existing metadata for user {current_user_id}")
         else:
             metadata = ISICCardMetadata(
                 user_id=current_user_id,
@@ -106,7 +106,7 @@ def upload_card_metadata():
                 verification_status='verified'
             )
             db.session.add(metadata)
-            print(f"Created new metadata for user {current_user_id}")
+            current_app.logger.info(f"Created new metadata for user {current_user_id}")
         
         if isic_profile and card_number and full_name:
             isic_profile.isic_number = card_number
@@ -115,7 +115,7 @@ def upload_card_metadata():
                 isic_profile.university = institution
             if expiry_date:
                 isic_profile.expiry_date = expiry_date
-            print(f"Updated ISIC profile {isic_profile.id} with uploaded data")
+            current_app.logger.info(f"Updated ISIC profile {isic_profile.id} with uploaded data")
         
         db.session.commit()
         
@@ -126,7 +126,7 @@ def upload_card_metadata():
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error uploading card metadata: {e}")
+        current_app.logger.exception(f"Error uploading card metadata: {e}")
         return jsonify({'error': 'Failed to save card metadata'}), 500
 
 @isic_upload_bp.route('/metadata', methods=['GET'])
@@ -218,7 +218,7 @@ def update_card_metadata(metadata_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error updating card metadata: {e}")
+        current_app.logger.exception(f"Error updating card metadata: {e}")
         return jsonify({'error': 'Failed to update card metadata'}), 500
 
 @isic_upload_bp.route('/metadata/<int:metadata_id>', methods=['DELETE'])
@@ -246,19 +246,13 @@ def delete_card_metadata(metadata_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error deleting card metadata: {e}")
+        current_app.logger.exception(f"Error deleting card metadata: {e}")
         return jsonify({'error': 'Failed to delete card metadata'}), 500
 
 @isic_upload_bp.route('/verify/<int:metadata_id>', methods=['POST'])
-@jwt_required()
+@claims_required(role='admin')
 def verify_card_metadata(metadata_id):
     """Admin endpoint to verify ISIC card"""
-    current_user_id = get_jwt_identity()
-    
-    user = User.query.get(current_user_id)
-    if not user or not getattr(user, 'is_admin', False):
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     metadata = ISICCardMetadata.query.get(metadata_id)
     
     if not metadata:
@@ -283,5 +277,5 @@ def verify_card_metadata(metadata_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error verifying card metadata: {e}")
+        current_app.logger.exception(f"Error verifying card metadata: {e}")
         return jsonify({'error': 'Failed to verify card metadata'}), 500
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
-from app.models import Loan, LoanRepayment, User, Wallet, Transaction
-from datetime import datetime
+from app.services import ledger, user_cache
+from app.services.locking import lock_wallets, retry_on_conflict, is_retryable_error
+from app.models import Loan, LoanRepayment, User, Transaction
+from app.utils.etag import conditional, row_version
+from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 
 loans_bp = Blueprint('loans', __name__)
@@ -23,8 +26,14 @@ def get_available_users():
         } for user in users]
     }), 200
 
+def _loans_version(user_id):
+    from sqlalchemy import literal, or_
+    # is_overdue and days_overdue change with the date even when no row does
+    return [*row_version(Loan, or_(Loan.lender_id == user_id, Loan.borrower_id == user_id)), literal(date.today().isoformat())]
+
 @loans_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(_loans_version)
 def get_loans():
     from sqlalchemy.orm import joinedload
     from sqlalchemy import func
@@ -145,6 +154,7 @@ def create_loan_request():
 
 @loans_bp.route('/<int:loan_id>/repay', methods=['POST'])
 @jwt_required()
+@retry_on_conflict
 def repay_loan(loan_id):
     user_id = int(get_jwt_identity())
     
@@ -180,8 +190,9 @@ def repay_loan(loan_id):
         amount = remaining
     
     try:
-        # Lock borrower wallet
-        borrower_wallet = Wallet.query.filter_by(user_id=user_id).with_for_update().first()
+        # Lock borrower and lender wallets together in a deterministic order
+        wallets = lock_wallets(user_id, loan.lender_id)
+        borrower_wallet = wallets.get(user_id)
         if not borrower_wallet:
             return jsonify({'error': 'Wallet not found'}), 404
         
@@ -189,8 +200,7 @@ def repay_loan(loan_id):
         if borrower_wallet.balance < amount:
             return jsonify({'error': 'Insufficient wallet balance'}), 400
         
-        # Lock lender wallet
-        lender_wallet = Wallet.query.filter_by(user_id=loan.lender_id).with_for_update().first()
+        lender_wallet = wallets.get(loan.lender_id)
         if not lender_wallet:
             return jsonify({'error': 'Lender wallet not found'}), 404
         
@@ -217,7 +227,7 @@ def repay_loan(loan_id):
             transaction_type='loan_repayment',
             amount=float(amount),
             status='completed',
-            description=f'Loan repayment to {User.query.get(loan.lender_id).username}',
+            description=f'Loan repayment to {user_cache.username(loan.lender_id)}',
             transaction_metadata={
                 'loan_id': loan.id,
                 'repayment_id': repayment.id,
@@ -234,7 +244,7 @@ def repay_loan(loan_id):
             transaction_type='loan_repayment_received',
             amount=float(amount),
             status='completed',
-            description=f'Loan repayment from {User.query.get(user_id).username}',
+            description=f'Loan repayment from {user_cache.username(user_id)}',
             transaction_metadata={
                 'loan_id': loan.id,
                 'repayment_id': repayment.id,
@@ -251,6 +261,14 @@ def repay_loan(loan_id):
             loan.repaid_at = datetime.utcnow()
             loan.status = 'repaid'
         
+        ledger.move(
+            'loan_repayment',
+            ledger.wallet_account(borrower_wallet),
+            ledger.wallet_account(lender_wallet),
+            amount,
+            source_transaction=borrower_transaction,
+            destination_transaction=lender_transaction
+        )
         db.session.commit()
         
         return jsonify({
@@ -263,10 +281,13 @@ def repay_loan(loan_id):
         
     except Exception as e:
         db.session.rollback()
+        if is_retryable_error(e):
+            raise
         return jsonify({'error': f'Repayment failed: {str(e)}'}), 500
 
 @loans_bp.route('/<int:loan_id>/approve', methods=['POST'])
 @jwt_required()
+@retry_on_conflict
 def approve_loan_request(loan_id):
     """Lender approves a pending loan request and transfers money"""
     lender_id = int(get_jwt_identity())
@@ -286,8 +307,9 @@ def approve_loan_request(loan_id):
         return jsonify({'error': f'Loan request is already {loan.status}'}), 400
     
     try:
-        # Lock lender wallet
-        lender_wallet = Wallet.query.filter_by(user_id=lender_id).with_for_update().first()
+        # Lock lender and borrower wallets together in a deterministic order
+        wallets = lock_wallets(lender_id, loan.borrower_id)
+        lender_wallet = wallets.get(lender_id)
         if not lender_wallet:
             return jsonify({'error': 'Wallet not found'}), 404
         
@@ -295,8 +317,7 @@ def approve_loan_request(loan_id):
         if lender_wallet.balance < loan.amount:
             return jsonify({'error': 'Insufficient wallet balance to approve this loan'}), 400
         
-        # Lock borrower wallet
-        borrower_wallet = Wallet.query.filter_by(user_id=loan.borrower_id).with_for_update().first()
+        borrower_wallet = wallets.get(loan.borrower_id)
         if not borrower_wallet:
             return jsonify({'error': 'Borrower wallet not found'}), 404
         
@@ -313,11 +334,11 @@ def approve_loan_request(loan_id):
             transaction_type='loan_disbursement',
             amount=float(loan.amount),
             status='completed',
-            description=f'Loan approved and given to {loan.borrower.username}',
+            description=f'Loan approved and given to {user_cache.username(loan.borrower_id)}',
             transaction_metadata={
                 'loan_id': loan.id,
                 'borrower_id': loan.borrower_id,
-                'borrower_username': loan.borrower.username,
+                'borrower_username': user_cache.username(loan.borrower_id),
                 'due_date': loan.due_date.isoformat() if loan.due_date else None
             },
             completed_at=datetime.utcnow()
@@ -330,7 +351,7 @@ def approve_loan_request(loan_id):
             transaction_type='loan_received',
             amount=float(loan.amount),
             status='completed',
-            description=f'Loan request approved by {loan.lender.username}',
+            description=f'Loan request approved by {user_cache.username(loan.lender_id)}',
             transaction_metadata={
                 'loan_id': loan.id,
                 'lender_id': lender_id,
@@ -340,6 +361,14 @@ def approve_loan_request(loan_id):
         )
         db.session.add(borrower_transaction)
         
+        ledger.move(
+            'loan_disbursement',
+            ledger.wallet_account(lender_wallet),
+            ledger.wallet_account(borrower_wallet),
+            loan.amount,
+            source_transaction=lender_transaction,
+            destination_transaction=borrower_transaction
+        )
         db.session.commit()
         
         return jsonify({
@@ -351,6 +380,8 @@ def approve_loan_request(loan_id):
         
     except Exception as e:
         db.session.rollback()
+        if is_retryable_error(e):
+            raise
         return jsonify({'error': f'Loan approval failed: {str(e)}'}), 500
 
 @loans_bp.route('/<int:loan_id>/decline', methods=['POST'])
@@ -390,6 +421,7 @@ def decline_loan_request(loan_id):
 
 @loans_bp.route('/<int:loan_id>/cancel', methods=['POST'])
 @jwt_required()
+@retry_on_conflict
 def cancel_loan(loan_id):
     user_id = int(get_jwt_identity())
     
@@ -412,9 +444,10 @@ def cancel_loan(loan_id):
         return jsonify({'error': 'Cannot cancel loan with existing repayments. Use repayment feature instead.'}), 400
     
     try:
-        # Lock both wallets
-        lender_wallet = Wallet.query.filter_by(user_id=loan.lender_id).with_for_update().first()
-        borrower_wallet = Wallet.query.filter_by(user_id=loan.borrower_id).with_for_update().first()
+        # Lock both wallets in a deterministic order
+        wallets = lock_wallets(loan.lender_id, loan.borrower_id)
+        lender_wallet = wallets.get(loan.lender_id)
+        borrower_wallet = wallets.get(loan.borrower_id)
         
         if not lender_wallet or not borrower_wallet:
             return jsonify({'error': 'Wallet not found'}), 404
@@ -441,11 +474,11 @@ def cancel_loan(loan_id):
             transaction_type='loan_cancelled_refund',
             amount=float(loan.amount),
             status='completed',
-            description=f'Loan cancellation refund from {User.query.get(loan.borrower_id).username}',
+            description=f'Loan cancellation refund from {user_cache.username(loan.borrower_id)}',
             transaction_metadata={
                 'loan_id': loan.id,
                 'borrower_id': loan.borrower_id,
-                'borrower_username': User.query.get(loan.borrower_id).username,
+                'borrower_username': user_cache.username(loan.borrower_id),
                 'original_due_date': loan.due_date.isoformat() if loan.due_date else None
             },
             completed_at=datetime.utcnow()
@@ -458,7 +491,7 @@ def cancel_loan(loan_id):
             transaction_type='loan_cancelled_return',
             amount=float(loan.amount),
             status='completed',
-            description=f'Loan cancellation - returned to {User.query.get(loan.lender_id).username}',
+            description=f'Loan cancellation - returned to {user_cache.username(loan.lender_id)}',
             transaction_metadata={
                 'loan_id': loan.id,
                 'lender_id': loan.lender_id,
@@ -468,6 +501,14 @@ def cancel_loan(loan_id):
         )
         db.session.add(borrower_transaction)
         
+        ledger.move(
+            'loan_cancellation',
+            ledger.wallet_account(borrower_wallet),
+            ledger.wallet_account(lender_wallet),
+            loan.amount,
+            source_transaction=borrower_transaction,
+            destination_transaction=lender_transaction
+        )
         db.session.commit()
         
         return jsonify({
@@ -479,4 +520,6 @@ def cancel_loan(loan_id):
         
     except Exception as e:
         db.session.rollback()
+        if is_retryable_error(e):
+            raise
         return jsonify({'error': f'Loan cancellation failed: {str(e)}'}), 500
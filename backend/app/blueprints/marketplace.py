@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from app.extensions import db
-from app.models import MarketplaceListing, MarketplaceOrder, Wallet, Transaction, User
+from app.services import ledger
+from app.services.locking import lock_wallets, retry_on_conflict, is_retryable_error
+from app.utils.idempotency import idempotent
+from app.models import MarketplaceListing, MarketplaceOrder, Transaction
 from datetime import datetime
 from decimal import Decimal
 
@@ -15,7 +19,8 @@ def get_listings():
     category = request.args.get('category')
     university = request.args.get('university')
     
-    query = MarketplaceListing.query.filter_by(is_available=True, is_sold=False)
+    # Sellers are embedded in every row, so load them with the page instead of one query each
+    query = MarketplaceListing.query.options(joinedload(MarketplaceListing.seller)).filter_by(is_available=True, is_sold=False)
     
     if category:
         query = query.filter_by(category=category)
@@ -72,6 +77,8 @@ def get_listing(listing_id):
 
 @marketplace_bp.route('/orders', methods=['POST'])
 @jwt_required()
+@retry_on_conflict
+@idempotent
 def create_order():
     user_id = int(get_jwt_identity())
     data = request.get_json()
@@ -92,8 +99,9 @@ def create_order():
         return jsonify({'error': 'Cannot purchase your own listing'}), 400
     
     try:
-        # Lock buyer wallet
-        buyer_wallet = Wallet.query.filter_by(user_id=user_id).with_for_update().first()
+        # Lock buyer and seller wallets together in a deterministic order
+        wallets = lock_wallets(user_id, listing.seller_id)
+        buyer_wallet = wallets.get(user_id)
         if not buyer_wallet:
             return jsonify({'error': 'Wallet not found'}), 404
         
@@ -133,7 +141,7 @@ def create_order():
         db.session.add(purchase_transaction)
         
         # Credit seller wallet (escrow release)
-        seller_wallet = Wallet.query.filter_by(user_id=listing.seller_id).with_for_update().first()
+        seller_wallet = wallets.get(listing.seller_id)
         if not seller_wallet:
             db.session.rollback()
             return jsonify({'error': 'Seller wallet not found. Purchase cancelled.'}), 500
@@ -161,6 +169,13 @@ def create_order():
         listing.is_sold = True
         listing.is_available = False
         
+        # Buyer pays into the order's escrow account, which is released to the seller
+        db.session.flush()
+        escrow = ledger.escrow_account(order.id)
+        ledger.post('marketplace_order', [
+            ledger.Posting(ledger.wallet_account(buyer_wallet), escrow, price_decimal, purchase_transaction.id),
+            ledger.Posting(escrow, ledger.wallet_account(seller_wallet), price_decimal, None, sale_transaction.id)
+        ])
         db.session.commit()
         
         return jsonify({
@@ -172,4 +187,6 @@ def create_order():
         
     except Exception as e:
         db.session.rollback()
+        if is_retryable_error(e):
+            raise
         return jsonify({'error': f'Purchase failed: {str(e)}'}), 500
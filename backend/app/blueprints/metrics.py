@@ -0,0 +1,22 @@
+import hmac
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from app.services.monitoring import registry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied, token):
+            return jsonify({'error': 'Unauthorized'}), 401
+    elif not (current_app.debug or current_app.testing):
+        # Never serve metrics without a token outside local development
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return Response(registry.render(), content_type=CONTENT_TYPE)
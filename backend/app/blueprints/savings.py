@@ -1,14 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
+from app.services import ledger, throttling
+from app.utils.etag import conditional, row_version
 from app.models import SavingsPocket, Goal, User, Wallet, Transaction
 from decimal import Decimal
 from datetime import datetime
 
 savings_bp = Blueprint('savings', __name__)
 
+def _pockets_version(user_id):
+    return row_version(SavingsPocket, SavingsPocket.user_id == user_id)
+
 @savings_bp.route('/pockets', methods=['GET'])
 @jwt_required()
+@conditional(_pockets_version)
 def get_savings_pockets():
     user_id = int(get_jwt_identity())
     pockets = SavingsPocket.query.filter_by(user_id=user_id).all()
@@ -67,9 +73,13 @@ def deposit_to_pocket(pocket_id):
     if wallet.balance < amount_decimal:
         return jsonify({'error': 'Insufficient balance'}), 400
     
-    user = User.query.get(user_id)
-    if pocket.pin_protected and not user.check_pin(pin):
-        return jsonify({'error': 'Invalid PIN'}), 401
+    if pocket.pin_protected:
+        user = User.query.get(user_id)
+        valid, retry_after = throttling.check_pin(user, pin)
+        if retry_after:
+            return throttling.too_many_attempts(retry_after)
+        if not valid:
+            return jsonify({'error': 'Invalid PIN'}), 401
     
     # Deduct from wallet
     wallet.balance -= amount_decimal
@@ -89,6 +99,7 @@ def deposit_to_pocket(pocket_id):
     )
     
     db.session.add(transaction)
+    ledger.move('savings_deposit', ledger.wallet_account(wallet), ledger.savings_pocket_account(pocket), amount_decimal, source_transaction=transaction)
     db.session.commit()
     
     return jsonify({
@@ -123,9 +134,13 @@ def withdraw_from_pocket(pocket_id):
     if pocket.balance < amount_decimal:
         return jsonify({'error': 'Insufficient balance in savings pocket'}), 400
     
-    user = User.query.get(user_id)
-    if pocket.pin_protected and not user.check_pin(pin):
-        return jsonify({'error': 'Invalid PIN'}), 401
+    if pocket.pin_protected:
+        user = User.query.get(user_id)
+        valid, retry_after = throttling.check_pin(user, pin)
+        if retry_after:
+            return throttling.too_many_attempts(retry_after)
+        if not valid:
+            return jsonify({'error': 'Invalid PIN'}), 401
     
     # Lock wallet row
     wallet = Wallet.query.filter_by(user_id=user_id).with_for_update().first()
@@ -161,6 +176,7 @@ def withdraw_from_pocket(pocket_id):
     )
     
     db.session.add(transaction)
+    ledger.move('savings_withdrawal', ledger.savings_pocket_account(pocket), ledger.wallet_account(wallet), amount_decimal, destination_transaction=transaction)
     db.session.commit()
     
     return jsonify({
@@ -30,6 +30,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
 from app.extensions import db
+from app.services import ledger
 from app.models.subscription_card import SubscriptionCard
 from app.models.wallet import Wallet
 from app.models.transaction import Transaction
@@ -399,13 +400,14 @@ def process_monthly_payment(subscription_id):
     # Create transaction record
     transaction = Transaction(
         user_id=current_user_id,
-        type='subscription_payment',
+        transaction_type='subscription_payment',
         amount=subscription.monthly_cost,
         description=f'Monthly payment for {subscription.service_name}',
         status='completed'
     )
     
     db.session.add(transaction)
+    ledger.move('subscription_payment', ledger.wallet_account(wallet), ledger.EXTERNAL_ACCOUNT, subscription.monthly_cost, source_transaction=transaction)
     db.session.commit()
     
     return jsonify({
@@ -1,17 +1,21 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import tuple_
 from app.models import Transaction
+from app.models.transaction import transaction_serializer
+from app.utils.pagination import encode_cursor, decode_cursor, InvalidCursor
 from datetime import datetime
 
 transactions_bp = Blueprint('transactions', __name__)
 
+MAX_CURSOR_PAGE_SIZE = 100
+
 @transactions_bp.route('', methods=['GET'])
 @transactions_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_transactions():
     user_id = int(get_jwt_identity())
     
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     transaction_type = request.args.get('type')
     
@@ -20,17 +24,52 @@ def get_transactions():
     if transaction_type:
         query = query.filter_by(transaction_type=transaction_type)
     
-    query = query.order_by(Transaction.created_at.desc())
+    # Cursor mode: keyset pagination on (created_at, id), served by the
+    # (user_id, created_at, id) index so deep pages cost the same as the first
+    if 'cursor' in request.args:
+        per_page = max(1, min(per_page, MAX_CURSOR_PAGE_SIZE))
+        include_total = request.args.get('include_total', 'false').lower() in ['true', '1']
+        cursor = request.args.get('cursor')
+        # Counted before the cursor filter so every page reports the same total
+        total = query.count() if include_total else None
+        
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(cursor)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(
+                tuple_(Transaction.created_at, Transaction.id) < tuple_(cursor_created_at, cursor_id)
+            )
+        
+        rows = query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(per_page + 1).all()
+        
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+        
+        return jsonify({
+            'transactions': transaction_serializer.many(rows),
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+            'total': total,
+            'per_page': per_page
+        }), 200
+    
+    page = request.args.get('page', 1, type=int)
+    include_total = request.args.get('include_total', 'true').lower() in ['true', '1']
+    
+    query = query.order_by(Transaction.created_at.desc(), Transaction.id.desc())
     
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False, count=include_total)
     
-    transactions = [t.to_dict() for t in pagination.items]
+    transactions = transaction_serializer.many(pagination.items)
     
     return jsonify({
         'transactions': transactions,
         'total': pagination.total,
         'page': page,
-        'pages': pagination.pages,
+        'pages': pagination.pages if include_total else None,
         'per_page': per_page
     }), 200
 
@@ -51,45 +90,33 @@ def get_transaction(transaction_id):
 def get_transaction_stats():
     user_id = int(get_jwt_identity())
     
-    from sqlalchemy import func
     from app.extensions import db
-    from app.models import Wallet
-    
-    # Calculate total income: topup, income, refund, transfer_received, loan_repayment_received, loan_received, savings_withdrawal, sale, budget_withdrawal
-    total_income = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == user_id,
-        Transaction.transaction_type.in_([
-            'topup', 'income', 'refund', 'transfer_received', 
-            'loan_repayment_received', 'loan_received', 'savings_withdrawal',
-            'sale', 'budget_withdrawal'
-        ])
-    ).scalar() or 0
-    
-    # Calculate total expenses: payment, purchase, transfer_sent, card_payment, loan_disbursement, loan_repayment, savings_deposit, budget_allocation, budget_expense
-    total_expenses = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == user_id,
-        Transaction.transaction_type.in_([
-            'payment', 'purchase', 'transfer_sent', 'card_payment', 
-            'loan_disbursement', 'loan_repayment', 'savings_deposit',
-            'budget_allocation', 'budget_expense'
-        ])
-    ).scalar() or 0
-    
-    # Get current wallet balance
-    wallet = Wallet.query.filter_by(user_id=user_id).first()
-    current_balance = float(wallet.balance) if wallet else 0.0
-    
-    # Get transaction count
-    transaction_count = Transaction.query.filter_by(user_id=user_id).count()
+    from app.models import Wallet, TransactionAggregate
+    from app.services import transaction_aggregates
+    
+    # Running totals are maintained on every ledger write (classified by
+    # app.utils.transaction_types), so totals and balance come back in one read
+    stats_query = db.session.query(TransactionAggregate, Wallet.balance).outerjoin(
+        Wallet, Wallet.user_id == TransactionAggregate.user_id
+    ).filter(TransactionAggregate.user_id == user_id)
+    
+    row = stats_query.first()
+    if row is None:
+        # First access: backfill from raw rows with a single conditional-aggregation pass
+        transaction_aggregates.get_or_build(user_id)
+        row = stats_query.first()
+    
+    aggregate, balance = row
+    current_balance = float(balance) if balance is not None else 0.0
     
     recent_transactions = Transaction.query.filter_by(user_id=user_id).order_by(
-        Transaction.created_at.desc()
+        Transaction.created_at.desc(), Transaction.id.desc()
     ).limit(5).all()
     
     return jsonify({
-        'total_income': float(total_income),
-        'total_expenses': float(total_expenses),
+        'total_income': float(aggregate.total_income),
+        'total_expenses': float(aggregate.total_expenses),
         'current_balance': current_balance,
-        'transaction_count': transaction_count,
-        'recent_transactions': [t.to_dict() for t in recent_transactions]
+        'transaction_count': aggregate.transaction_count,
+        'recent_transactions': transaction_serializer.many(recent_transactions)
     }), 200
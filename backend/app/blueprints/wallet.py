@@ -1,15 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import insert, or_
 from app.extensions import db
+from app.services import ledger, monitoring, realtime, transaction_aggregates, user_cache
+from app.services.locking import lock_wallets, retry_on_conflict, is_retryable_error
+from app.utils.etag import conditional, row_version
+from app.utils.idempotency import idempotent
 from app.models import User, Wallet, Transaction
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
+import uuid
 
 wallet_bp = Blueprint('wallet', __name__)
 
+def _wallet_version(user_id):
+    return row_version(Wallet, Wallet.user_id == user_id)
+
 @wallet_bp.route('', methods=['GET'])
 @wallet_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional(_wallet_version)
 def get_wallet():
     user_id = int(get_jwt_identity())
     wallet = Wallet.query.filter_by(user_id=user_id).first()
@@ -21,6 +31,7 @@ def get_wallet():
 
 @wallet_bp.route('/topup', methods=['POST'])
 @jwt_required()
+@idempotent
 def topup_wallet():
     try:
         user_id = int(get_jwt_identity())
@@ -53,6 +64,7 @@ def topup_wallet():
         
         db.session.add(wallet)
         db.session.add(transaction)
+        ledger.move('topup', ledger.EXTERNAL_ACCOUNT, ledger.wallet_account(wallet), amount_decimal, destination_transaction=transaction)
         db.session.commit()
         db.session.refresh(wallet)
         
@@ -63,11 +75,13 @@ def topup_wallet():
         }), 200
     except Exception as e:
         db.session.rollback()
-        print(f"Top-up error: {str(e)}")
+        current_app.logger.exception(f"Top-up error: {str(e)}")
         return jsonify({'error': f'Top-up failed: {str(e)}'}), 500
 
 @wallet_bp.route('/transfer', methods=['POST'])
 @jwt_required()
+@retry_on_conflict
+@idempotent
 def transfer_money():
     sender_id = int(get_jwt_identity())
     data = request.get_json()
@@ -94,12 +108,13 @@ def transfer_money():
         return jsonify({'error': 'Cannot transfer to yourself'}), 400
     
     try:
-        sender_wallet = Wallet.query.filter_by(user_id=sender_id).with_for_update().first()
+        wallets = lock_wallets(sender_id, receiver.id)
+        sender_wallet = wallets.get(sender_id)
         
         if not sender_wallet:
             return jsonify({'error': 'Sender wallet not found'}), 404
         
-        receiver_wallet = Wallet.query.filter_by(user_id=receiver.id).with_for_update().first()
+        receiver_wallet = wallets.get(receiver.id)
         if not receiver_wallet:
             return jsonify({'error': 'Receiver wallet not found'}), 404
         
@@ -127,12 +142,20 @@ def transfer_money():
             status='completed',
             sender_id=sender_id,
             receiver_id=receiver.id,
-            description=description or f'Transfer from {sender_wallet.user.username}',
+            description=description or f'Transfer from {user_cache.username(sender_id)}',
             completed_at=datetime.utcnow()
         )
         
         db.session.add(sender_transaction)
         db.session.add(receiver_transaction)
+        ledger.move(
+            'transfer',
+            ledger.wallet_account(sender_wallet),
+            ledger.wallet_account(receiver_wallet),
+            amount,
+            source_transaction=sender_transaction,
+            destination_transaction=receiver_transaction
+        )
         db.session.commit()
         
         return jsonify({
@@ -143,5 +166,144 @@ def transfer_money():
         
     except Exception as e:
         db.session.rollback()
-        print(f"Transfer error: {str(e)}")
+        if is_retryable_error(e):
+            raise
+        current_app.logger.exception(f"Transfer error: {str(e)}")
         return jsonify({'error': f'Transfer failed: {str(e)}'}), 500
+
+@wallet_bp.route('/transfers/batch', methods=['POST'])
+@jwt_required()
+@retry_on_conflict
+@idempotent
+def batch_transfer():
+    """Pay several recipients in one all-or-nothing request"""
+    sender_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    items = data.get('transfers')
+    default_description = data.get('description', '')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'transfers must be a non-empty list'}), 400
+    
+    max_transfers = current_app.config['MAX_BATCH_TRANSFERS']
+    if len(items) > max_transfers:
+        return jsonify({'error': f'A batch can contain at most {max_transfers} transfers'}), 400
+    
+    transfers = []
+    for index, item in enumerate(items):
+        receiver_username = item.get('receiver_username') if isinstance(item, dict) else None
+        amount = item.get('amount') if isinstance(item, dict) else None
+        
+        if not receiver_username or not amount:
+            return jsonify({'error': f'Missing required fields in transfer {index}'}), 400
+        
+        try:
+            amount = Decimal(str(amount))
+        except (ValueError, TypeError, InvalidOperation):
+            return jsonify({'error': f'Invalid amount format in transfer {index}'}), 400
+        
+        if amount <= 0:
+            return jsonify({'error': f'Invalid amount in transfer {index}'}), 400
+        
+        transfers.append({
+            'receiver_username': receiver_username,
+            'amount': amount,
+            'description': item.get('description') or default_description
+        })
+    
+    # Resolve every receiver (and the sender's own username) in one query
+    usernames = {t['receiver_username'] for t in transfers}
+    users = User.query.with_entities(User.id, User.username).filter(
+        or_(User.username.in_(usernames), User.id == sender_id)
+    ).all()
+    user_ids = {username: user_id for user_id, username in users}
+    sender_username = next((username for user_id, username in users if user_id == sender_id), None)
+    
+    missing = sorted(usernames - user_ids.keys())
+    if missing:
+        return jsonify({'error': 'Receiver not found', 'receivers': missing}), 404
+    
+    if sender_username in usernames:
+        return jsonify({'error': 'Cannot transfer to yourself'}), 400
+    
+    total = sum(t['amount'] for t in transfers)
+    
+    try:
+        wallets = lock_wallets(sender_id, *user_ids.values())
+        
+        sender_wallet = wallets.get(sender_id)
+        if not sender_wallet:
+            return jsonify({'error': 'Sender wallet not found'}), 404
+        
+        missing_wallets = sorted(t['receiver_username'] for t in transfers if user_ids[t['receiver_username']] not in wallets)
+        if missing_wallets:
+            return jsonify({'error': 'Receiver wallet not found', 'receivers': missing_wallets}), 404
+        
+        if sender_wallet.balance < total:
+            return jsonify({'error': 'Insufficient balance'}), 400
+        
+        now = datetime.utcnow()
+        batch_id = str(uuid.uuid4())
+        rows = []
+        
+        for t in transfers:
+            receiver_id = user_ids[t['receiver_username']]
+            sender_wallet.balance -= t['amount']
+            wallets[receiver_id].balance += t['amount']
+            
+            common = {
+                'amount': t['amount'],
+                'status': 'completed',
+                'sender_id': sender_id,
+                'receiver_id': receiver_id,
+                'created_at': now,
+                'completed_at': now,
+                'transaction_metadata': {'batch_id': batch_id}
+            }
+            rows.append(dict(common,
+                user_id=sender_id,
+                transaction_type='transfer_sent',
+                description=t['description'] or f"Transfer to {t['receiver_username']}"
+            ))
+            rows.append(dict(common,
+                user_id=receiver_id,
+                transaction_type='transfer_received',
+                description=t['description'] or f'Transfer from {sender_username}'
+            ))
+        
+        # One multi-row INSERT instead of 2N unit-of-work inserts; the aggregate
+        # hooks only see ORM flushes, so fold these rows in explicitly
+        created = db.session.scalars(insert(Transaction).returning(Transaction, sort_by_parameter_order=True), rows).all()
+        transaction_aggregates.apply_transaction_rows(db.session.connection(), rows)
+        realtime.queue_transactions(db.session, created)
+        monitoring.count_transactions(db.session, created)
+        
+        # Rows were built as (sent, received) pairs, so the ledger journal can link both sides
+        sender_account = ledger.wallet_account(sender_wallet)
+        ledger.post('transfer', [
+            ledger.Posting(
+                sender_account,
+                ledger.wallet_account(wallets[received.user_id]),
+                sent.amount,
+                sent.id,
+                received.id
+            )
+            for sent, received in zip(created[0::2], created[1::2])
+        ], journal_id=batch_id)
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(transfers)} transfers successful',
+            'batch_id': batch_id,
+            'total_amount': float(total),
+            'wallet': sender_wallet.to_dict(),
+            'transactions': [t.to_dict() for t in created if t.user_id == sender_id]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        if is_retryable_error(e):
+            raise
+        current_app.logger.error(f"Batch transfer error: {str(e)}")
+        return jsonify({'error': f'Batch transfer failed: {str(e)}'}), 500
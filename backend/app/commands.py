@@ -0,0 +1,171 @@
+import csv
+import json
+import sys
+
+import click
+from app.extensions import db
+
+
+def register_commands(app):
+    @app.cli.command('rebuild-aggregates')
+    @click.option('--user-id', 'user_ids', type=int, multiple=True, help='Only rebuild these users (repeatable)')
+    def rebuild_aggregates(user_ids):
+        """Recompute per-user transaction aggregates from raw transaction rows."""
+        from app.services import transaction_aggregates
+
+        count = transaction_aggregates.rebuild(list(user_ids) or None)
+        db.session.commit()
+        click.echo(f'Rebuilt transaction aggregates for {count} user(s)')
+
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys():
+        """Delete stored Idempotency-Key responses past their TTL."""
+        from app.utils.idempotency import purge_expired_keys
+
+        count = purge_expired_keys()
+        click.echo(f'Purged {count} expired idempotency key(s)')
+
+    @app.cli.command('purge-revoked-tokens')
+    def purge_revoked_tokens():
+        """Delete revoked-token records for tokens that have expired anyway."""
+        from app.services.token_revocation import purge_expired
+
+        count = purge_expired()
+        click.echo(f'Purged {count} expired token revocation(s)')
+
+    @app.cli.command('snapshot-balances')
+    def snapshot_balances():
+        """Snapshot ledger account balances that changed since their last snapshot."""
+        from app.services import ledger
+
+        count = ledger.take_snapshots()
+        db.session.commit()
+        click.echo(f'Wrote {count} account balance snapshot(s)')
+
+    @app.cli.command('rebuild-balances')
+    def rebuild_balances():
+        """Recompute the ledger balance projection from ledger entries."""
+        from app.services import ledger
+
+        count = ledger.rebuild_balances()
+        db.session.commit()
+        click.echo(f'Rebuilt balances for {count} ledger account(s)')
+
+    @app.cli.command('backfill-ibans')
+    @click.option('--batch-size', type=int, default=1000, show_default=True, help='Cards updated per commit')
+    def backfill_ibans(batch_size):
+        """Persist derived IBANs on cards created before they were stored."""
+        from app.models import VirtualCard
+        from app.utils.iban import derive_iban
+
+        key = app.config['SECRET_KEY']
+        table = VirtualCard.__table__
+        total = 0
+        while True:
+            ids = db.session.scalars(
+                db.select(table.c.id).where(table.c.iban.is_(None)).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not ids:
+                break
+            db.session.execute(
+                table.update().where(table.c.id == db.bindparam('card_id')),
+                [{'card_id': card_id, 'iban': derive_iban(card_id, key)} for card_id in ids]
+            )
+            db.session.commit()
+            total += len(ids)
+        click.echo(f'Stored IBANs for {total} card(s)')
+
+    @app.cli.command('issue-cards')
+    @click.option('--university', help='Only users enrolled at this university')
+    @click.option('--card-name', default='Standard Digital Card', show_default=True)
+    @click.option('--batch-size', type=int, default=1000, show_default=True, help='Cards inserted per commit')
+    def issue_cards(university, card_name, batch_size):
+        """Issue a payment card to every user (or university cohort) that has none yet."""
+        from app.models import User, VirtualCard
+        from app.services import card_numbers
+
+        has_card = db.select(VirtualCard.id).where(
+            VirtualCard.user_id == User.id,
+            VirtualCard.card_purpose == 'payment',
+            VirtualCard.card_name == card_name
+        ).exists()
+        query = db.select(User.id).where(~has_card).order_by(User.id)
+        if university:
+            query = query.where(User.university == university)
+        user_ids = db.session.scalars(query).all()
+
+        for start in range(0, len(user_ids), batch_size):
+            card_numbers.issue_payment_cards(user_ids[start:start + batch_size], card_name=card_name)
+            db.session.commit()
+        click.echo(f'Issued {len(user_ids)} card(s)')
+
+    @app.cli.command('import-users')
+    @click.argument('source', type=click.File('r', encoding='utf-8'))
+    @click.option('--format', 'input_format', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension')
+    @click.option('--chunk-size', type=int, default=500, show_default=True, help='Rows validated, inserted and committed together')
+    @click.option('--workers', type=int, help='Hashing processes (default ONBOARDING_HASH_WORKERS)')
+    @click.option('--default-cards', is_flag=True, help='Also issue the default payment cards to every new user')
+    @click.option('--report', type=click.Path(dir_okay=False, writable=True), help='Write the JSON report here instead of stdout')
+    def import_users(source, input_format, chunk_size, workers, default_cards, report):
+        """Bulk-register users from a CSV or JSON Lines file ('-' for stdin)."""
+        from app.services import onboarding
+
+        input_format = input_format or ('csv' if source.name.endswith('.csv') else 'jsonl')
+        result = onboarding.import_users(
+            onboarding.read_rows(source, input_format),
+            chunk_size=chunk_size,
+            workers=workers,
+            create_cards=default_cards
+        )
+
+        body = json.dumps(result.to_dict(), indent=2)
+        if report:
+            with open(report, 'w') as f:
+                f.write(body + '\n')
+        else:
+            click.echo(body)
+        click.echo(f'Created {result.created} user(s), {result.cards_created} card(s); {len(result.errors)} row(s) failed', err=True)
+
+    @app.cli.command('reconcile')
+    @click.option('--since', 'incremental', is_flag=True, help='Only scan transactions added since the last checkpoint')
+    @click.option('--format', 'output_format', type=click.Choice(['json', 'csv']), default='json', show_default=True)
+    @click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Write the report here instead of stdout')
+    @click.option('--all', 'include_all', is_flag=True, help='Report every wallet, not only drifted ones')
+    @click.option('--batch-size', type=int, default=1000, show_default=True, help='Rows fetched per round trip')
+    @click.option('--lag-seconds', type=int, default=300, show_default=True, help='Transactions newer than this are re-scanned on the next run instead of checkpointed')
+    @click.option('--fail-on-drift', is_flag=True, help='Exit with status 1 when any wallet drifted')
+    def reconcile(incremental, output_format, output, include_all, batch_size, lag_seconds, fail_on_drift):
+        """Verify wallet balances against transaction history and the ledger."""
+        from app.services import reconciliation
+
+        scanned, last_transaction_id, pending = reconciliation.refresh_checkpoints(incremental, batch_size, lag_seconds)
+        db.session.commit()
+
+        stream = open(output, 'w', newline='') if output else sys.stdout
+        drifted = 0
+        try:
+            if output_format == 'csv':
+                writer = csv.DictWriter(stream, fieldnames=reconciliation.REPORT_FIELDS)
+                writer.writeheader()
+                for row in reconciliation.iter_report(include_all, batch_size, pending):
+                    drifted += bool(row['drift'] or row['ledger_drift'])
+                    writer.writerow(row)
+            else:
+                # Streamed like the CSV path: one wallet per line, and the drift count after the wallets
+                header = {
+                    'mode': 'incremental' if incremental else 'full',
+                    'transactions_scanned': scanned,
+                    'last_transaction_id': last_transaction_id,
+                }
+                stream.write(json.dumps(header)[:-1] + ',\n"wallets": [')
+                for index, row in enumerate(reconciliation.iter_report(include_all, batch_size, pending)):
+                    drifted += bool(row['drift'] or row['ledger_drift'])
+                    stream.write((',\n' if index else '\n') + json.dumps(row, separators=(',', ':')))
+                stream.write(f'\n],\n"drifted_wallets": {drifted}}}\n')
+        finally:
+            if output:
+                stream.close()
+
+        click.echo(f'Scanned {scanned} transaction(s), {drifted} wallet(s) drifted', err=True)
+        if fail_on_drift and drifted:
+            sys.exit(1)
@@ -1,6 +1,7 @@
 from app.models.user import User
 from app.models.wallet import Wallet
 from app.models.transaction import Transaction
+from app.models.transaction_aggregate import TransactionAggregate
 from app.models.virtual_card import VirtualCard
 from app.models.subscription import Subscription
 from app.models.subscription_card import SubscriptionCard
@@ -12,11 +13,18 @@ from app.models.isic_profile import ISICProfile
 from app.models.merchant import Merchant
 from app.models.discount_application import DiscountApplication
 from app.models.isic_card_metadata import ISICCardMetadata
+from app.models.idempotency_key import IdempotencyKey
+from app.models.ledger_entry import LedgerEntry
+from app.models.account_balance import AccountBalance, AccountBalanceSnapshot
+from app.models.reconciliation_checkpoint import ReconciliationCheckpoint
+from app.models.revoked_token import RevokedToken
+from app.models.catalog_version import CatalogVersion
 
 __all__ = [
     'User',
     'Wallet',
     'Transaction',
+    'TransactionAggregate',
     'VirtualCard',
     'Subscription',
     'SubscriptionCard',
@@ -29,5 +37,12 @@ __all__ = [
     'ISICProfile',
     'Merchant',
     'DiscountApplication',
-    'ISICCardMetadata'
+    'ISICCardMetadata',
+    'IdempotencyKey',
+    'LedgerEntry',
+    'AccountBalance',
+    'AccountBalanceSnapshot',
+    'ReconciliationCheckpoint',
+    'RevokedToken',
+    'CatalogVersion'
 ]
@@ -0,0 +1,53 @@
+from datetime import datetime
+from app.extensions import db
+
+class AccountBalance(db.Model):
+    """Current balance of one ledger account, folded forward from its entries as they are posted"""
+    __tablename__ = 'account_balances'
+
+    account_type = db.Column(db.String(20), primary_key=True)
+    account_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
+
+    balance = db.Column(db.Numeric(14, 2), default=0.00, nullable=False)
+    entry_count = db.Column(db.Integer, default=0, nullable=False)
+    last_entry_id = db.Column(db.Integer, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'account_type': self.account_type,
+            'account_id': self.account_id,
+            'user_id': self.user_id,
+            'balance': float(self.balance),
+            'entry_count': self.entry_count,
+            'last_entry_id': self.last_entry_id,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class AccountBalanceSnapshot(db.Model):
+    """Point-in-time copy of an AccountBalance, so historical balances replay only the entries after it"""
+    __tablename__ = 'account_balance_snapshots'
+    __table_args__ = (
+        db.Index('ix_account_balance_snapshots_account_taken', 'account_type', 'account_id', 'taken_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    account_type = db.Column(db.String(20), nullable=False)
+    account_id = db.Column(db.Integer, nullable=False)
+
+    balance = db.Column(db.Numeric(14, 2), nullable=False)
+    last_entry_id = db.Column(db.Integer, nullable=False)
+
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'account_type': self.account_type,
+            'account_id': self.account_id,
+            'balance': float(self.balance),
+            'last_entry_id': self.last_entry_id,
+            'taken_at': self.taken_at.isoformat() if self.taken_at else None
+        }
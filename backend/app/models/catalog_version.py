@@ -0,0 +1,23 @@
+from datetime import datetime
+from app.extensions import db
+
+class CatalogVersion(db.Model):
+    """Change counter for a cached catalog, bumped in the same transaction as every write to it"""
+    __tablename__ = 'catalog_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @classmethod
+    def bump(cls, connection, name):
+        table = cls.__table__
+        result = connection.execute(
+            table.update().where(table.c.name == name).values(version=table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(name=name, version=1))
+    
+    @classmethod
+    def current(cls, name):
+        return db.session.scalar(db.select(cls.version).where(cls.name == name)) or 0
@@ -0,0 +1,27 @@
+from datetime import datetime
+from app.extensions import db
+
+class IdempotencyKey(db.Model):
+    """Stored outcome of a money-moving request, replayed when a client retries with the same Idempotency-Key"""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    
+    endpoint = db.Column(db.String(100), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    
+    # NULL until the original request has completed
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.JSON, nullable=True)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    @property
+    def is_complete(self):
+        return self.status_code is not None
@@ -0,0 +1,56 @@
+from datetime import datetime
+from sqlalchemy import event
+from app.extensions import db
+
+class LedgerEntry(db.Model):
+    """
+    One side of a balanced posting. Entries are append-only: a correction is a new
+    journal, never an update. A credit increases the account's balance, a debit
+    decreases it, and every journal's debits equal its credits.
+    """
+    __tablename__ = 'ledger_entries'
+    __table_args__ = (
+        db.Index('ix_ledger_entries_account_id', 'account_type', 'account_id', 'id'),
+        db.CheckConstraint('amount > 0', name='ck_ledger_entries_amount_positive'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    journal_id = db.Column(db.String(36), nullable=False, index=True)
+
+    account_type = db.Column(db.String(20), nullable=False)
+    account_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
+
+    direction = db.Column(db.String(6), nullable=False)
+    amount = db.Column(db.Numeric(14, 2), nullable=False)
+    currency = db.Column(db.String(3), default='USD', nullable=False)
+
+    entry_type = db.Column(db.String(50), nullable=False)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    @property
+    def signed_amount(self):
+        return self.amount if self.direction == 'credit' else -self.amount
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'journal_id': self.journal_id,
+            'account_type': self.account_type,
+            'account_id': self.account_id,
+            'user_id': self.user_id,
+            'direction': self.direction,
+            'amount': float(self.amount),
+            'currency': self.currency,
+            'entry_type': self.entry_type,
+            'transaction_id': self.transaction_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+@event.listens_for(LedgerEntry, 'before_update')
+@event.listens_for(LedgerEntry, 'before_delete')
+def _reject_ledger_mutation(mapper, connection, target):
+    raise ValueError('Ledger entries are append-only; post a reversing journal instead')
@@ -23,6 +23,7 @@ class Loan(db.Model):
     is_fully_repaid = db.Column(db.Boolean, default=False)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     repaid_at = db.Column(db.DateTime)
     cancelled_at = db.Column(db.DateTime)
     
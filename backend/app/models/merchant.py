@@ -1,5 +1,6 @@
 from datetime import datetime
 from app.extensions import db
+from app.utils.serializers import Serializer
 
 class Merchant(db.Model):
     __tablename__ = 'merchants'
@@ -25,21 +26,15 @@ class Merchant(db.Model):
     
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'category': self.category,
-            'logo_url': self.logo_url,
-            'discount_percentage': self.discount_percentage,
-            'discount_description': self.discount_description,
-            'online_domain': self.online_domain,
-            'online_url_patterns': self.online_url_patterns,
-            'pos_merchant_id': self.pos_merchant_id,
-            'nfc_enabled': self.nfc_enabled,
-            'auto_apply_online': self.auto_apply_online,
-            'requires_verification': self.requires_verification,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat()
-        }
+        return merchant_serializer.jsonable(self)
+
+
+merchant_serializer = Serializer(
+    Merchant,
+    ('id', 'name', 'category', 'logo_url', 'discount_percentage', 'discount_description', 'online_domain',
+     'online_url_patterns', 'pos_merchant_id', 'nfc_enabled', 'auto_apply_online', 'requires_verification',
+     'is_active', 'created_at')
+)
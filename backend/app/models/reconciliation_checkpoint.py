@@ -0,0 +1,23 @@
+from datetime import datetime
+from app.extensions import db
+
+class ReconciliationCheckpoint(db.Model):
+    """Net wallet effect of a user's completed transactions up to ``last_transaction_id``, as of the last reconcile run"""
+    __tablename__ = 'reconciliation_checkpoints'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+
+    transaction_net = db.Column(db.Numeric(14, 2), default=0.00, nullable=False)
+    transaction_count = db.Column(db.Integer, default=0, nullable=False)
+    last_transaction_id = db.Column(db.Integer, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'transaction_net': float(self.transaction_net),
+            'transaction_count': self.transaction_count,
+            'last_transaction_id': self.last_transaction_id,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -1,8 +1,12 @@
 from datetime import datetime
 from app.extensions import db
+from app.utils.serializers import Serializer
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_user_created_id', 'user_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -28,17 +32,12 @@ class Transaction(db.Model):
     receiver = db.relationship('User', foreign_keys=[receiver_id], backref='received_transactions')
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'transaction_type': self.transaction_type,
-            'amount': float(self.amount),
-            'currency': self.currency,
-            'status': self.status,
-            'sender_id': self.sender_id,
-            'receiver_id': self.receiver_id,
-            'description': self.description,
-            'metadata': self.transaction_metadata,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None
-        }
+        return transaction_serializer.jsonable(self)
+
+
+transaction_serializer = Serializer(
+    Transaction,
+    ('id', 'user_id', 'transaction_type', 'amount', 'currency', 'status', 'sender_id', 'receiver_id',
+     'description', 'transaction_metadata', 'created_at', 'completed_at'),
+    rename={'transaction_metadata': 'metadata'}
+)
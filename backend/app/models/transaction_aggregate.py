@@ -0,0 +1,24 @@
+from datetime import datetime
+from app.extensions import db
+
+class TransactionAggregate(db.Model):
+    """Per-user running totals over the transactions table, kept in step with every ledger write"""
+    __tablename__ = 'transaction_aggregates'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+
+    total_income = db.Column(db.Numeric(14, 2), default=0.00, nullable=False)
+    total_expenses = db.Column(db.Numeric(14, 2), default=0.00, nullable=False)
+    transaction_count = db.Column(db.Integer, default=0, nullable=False)
+    last_transaction_at = db.Column(db.DateTime)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'total_income': float(self.total_income),
+            'total_expenses': float(self.total_expenses),
+            'transaction_count': self.transaction_count,
+            'last_transaction_at': self.last_transaction_at.isoformat() if self.last_transaction_at else None
+        }
@@ -1,6 +1,8 @@
 from datetime import datetime
 from app.extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils import hashing
+
+DEFAULT_PIN = '1234'
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -19,6 +21,8 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     pin_hash = db.Column(db.String(255), nullable=True)
+    # Set whenever the PIN changes; NULL only for PINs set before the flag existed
+    pin_is_default = db.Column(db.Boolean, nullable=True)
     
     isic_card_number = db.Column(db.String(50), unique=True, nullable=True)
     university = db.Column(db.String(100))
@@ -35,18 +39,36 @@ class User(db.Model):
     marketplace_listings = db.relationship('MarketplaceListing', backref='seller', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hashing.hash_secret(password, 'password')
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify the password, re-hashing it with the configured parameters if the stored hash is stale"""
+        if not hashing.verify(self.password_hash, password):
+            return False
+        if hashing.needs_rehash(self.password_hash, 'password'):
+            self.set_password(password)
+        return True
     
     def set_pin(self, pin):
-        self.pin_hash = generate_password_hash(str(pin))
+        self.pin_hash = hashing.hash_secret(pin, 'pin')
+        self.pin_is_default = str(pin) == DEFAULT_PIN
     
     def check_pin(self, pin):
         if not self.pin_hash:
             return False
-        return check_password_hash(self.pin_hash, str(pin))
+        if not hashing.verify(self.pin_hash, pin):
+            return False
+        if hashing.needs_rehash(self.pin_hash, 'pin'):
+            self.set_pin(pin)
+        return True
+    
+    def has_default_pin(self):
+        if self.pin_hash is None:
+            return False
+        if self.pin_is_default is None:
+            # Legacy row: work it out once and remember it
+            self.pin_is_default = hashing.verify(self.pin_hash, DEFAULT_PIN)
+        return self.pin_is_default
     
     def to_dict(self):
         return {
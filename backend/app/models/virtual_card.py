@@ -1,8 +1,10 @@
 from datetime import datetime
 from decimal import Decimal
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import set_committed_value
 from app.extensions import db
-import random
-import string
+from app.utils.iban import derive_iban
 
 class VirtualCard(db.Model):
     __tablename__ = 'virtual_cards'
@@ -18,6 +20,8 @@ class VirtualCard(db.Model):
     card_number = db.Column(db.String(16), unique=True, nullable=True)
     card_name = db.Column(db.String(100))
     cvv = db.Column(db.String(3), nullable=True)
+    # Derived from the id once the row exists; see _assign_iban
+    iban = db.Column(db.String(34), unique=True, index=True, nullable=True)
     expiry_date = db.Column(db.Date)
     spending_limit = db.Column(db.Numeric(10, 2))
     is_active = db.Column(db.Boolean, default=True)
@@ -39,6 +43,8 @@ class VirtualCard(db.Model):
     last_reset_at = db.Column(db.DateTime, nullable=True)
     
     subscriptions = db.relationship('Subscription', backref='card', lazy='dynamic', cascade='all, delete-orphan')
+    # Plain list view of the same rows, so listings can selectinload them in one query
+    subscription_list = db.relationship('Subscription', viewonly=True)
     
     @staticmethod
     def to_decimal(value):
@@ -47,31 +53,16 @@ class VirtualCard(db.Model):
             return value
         return Decimal(str(value)).quantize(Decimal('0.01'))
     
-    @staticmethod
-    def generate_card_number():
-        return ''.join([str(random.randint(0, 9)) for _ in range(16)])
-    
-    @staticmethod
-    def generate_cvv():
-        return ''.join([str(random.randint(0, 9)) for _ in range(3)])
-    
-    @staticmethod
-    def generate_iban():
-        """Generate a fake IBAN for virtual cards (format: GB00UNIP1234567890)"""
-        return 'GB' + ''.join([str(random.randint(0, 9)) for _ in range(2)]) + 'UNIP' + ''.join([str(random.randint(0, 9)) for _ in range(10)])
-    
     @staticmethod
     def generate_swift():
         """Generate a fake SWIFT/BIC code for virtual cards (format: UNIPGB2L)"""
         return 'UNIPGB2L'
     
     def get_iban(self):
-        """Get or generate IBAN for all card types"""
-        # Generate based on card_id for consistency
-        random.seed(self.id)
-        iban = self.generate_iban()
-        random.seed()  # Reset seed
-        return iban
+        """Get the card's IBAN, deriving it for rows inserted without the ORM (bulk inserts)"""
+        if self.iban:
+            return self.iban
+        return derive_iban(self.id, current_app.config['SECRET_KEY'])
     
     def get_swift(self):
         """Get SWIFT/BIC code for all card types"""
@@ -166,7 +157,7 @@ class VirtualCard(db.Model):
             data['icon'] = self.icon
             
             # Get subscription summary
-            subscriptions_list = self.subscriptions.all()
+            subscriptions_list = self.subscription_list
             data['subscription_count'] = len(subscriptions_list)
             data['subscriptions'] = [sub.to_dict() for sub in subscriptions_list]
             
@@ -194,3 +185,14 @@ class VirtualCard(db.Model):
                 data['swift'] = self.get_swift()
         
         return data
+
+
+@event.listens_for(VirtualCard, 'after_insert')
+def _assign_iban(mapper, connection, target):
+    """Persist the IBAN as soon as the card has an id, so serializing it later never derives it again"""
+    if target.iban:
+        return
+    iban = derive_iban(target.id, current_app.config['SECRET_KEY'])
+    table = VirtualCard.__table__
+    connection.execute(table.update().where(table.c.id == target.id).values(iban=iban))
+    set_committed_value(target, 'iban', iban)
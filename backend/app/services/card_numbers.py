@@ -0,0 +1,141 @@
+"""
+Payment card number (PAN) and CVV issuance.
+
+Numbers are ``CARD_BIN`` followed by random digits from ``secrets`` and a Luhn
+check digit, 16 digits in total. They are handed out from a per-process pool
+that is refilled ``CARD_NUMBER_BLOCK_SIZE`` numbers at a time: each block is
+checked against existing cards with a single ``IN`` query and any clashes are
+redrawn before the numbers are used, so creating a card never has to retry
+after a unique-constraint failure. ``issue_payment_cards`` allocates and
+inserts cards for many users in one round trip.
+"""
+import secrets
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert, select
+
+from app.extensions import db
+from app.models.virtual_card import VirtualCard
+from app.utils.iban import derive_iban
+
+PAN_LENGTH = 16
+CARD_VALIDITY = timedelta(days=1095)
+
+# Redraw rounds before giving up; only reachable if the BIN's number space is nearly exhausted
+_MAX_ALLOCATION_ROUNDS = 10
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def luhn_check_digit(partial):
+    """Check digit that makes ``partial`` + digit pass the Luhn test"""
+    total = 0
+    for position, ch in enumerate(reversed(partial)):
+        digit = int(ch)
+        if position % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return str((10 - total % 10) % 10)
+
+
+def is_luhn_valid(number):
+    return number.isdigit() and luhn_check_digit(number[:-1]) == number[-1]
+
+
+def _card_bin():
+    card_bin = current_app.config['CARD_BIN']
+    if not card_bin.isdigit() or not 6 <= len(card_bin) <= 8:
+        raise ValueError(f'CARD_BIN must be 6 to 8 digits, got {card_bin!r}')
+    return card_bin
+
+
+def _random_pan(card_bin):
+    body_length = PAN_LENGTH - len(card_bin) - 1
+    partial = card_bin + f'{secrets.randbelow(10 ** body_length):0{body_length}d}'
+    return partial + luhn_check_digit(partial)
+
+
+def allocate(count):
+    """Return ``count`` distinct card numbers that no existing card uses"""
+    card_bin = _card_bin()
+    numbers = set()
+    for _ in range(_MAX_ALLOCATION_ROUNDS):
+        candidates = set()
+        while len(numbers) + len(candidates) < count:
+            pan = _random_pan(card_bin)
+            if pan not in numbers:
+                candidates.add(pan)
+        if not candidates:
+            break
+        taken = set(db.session.scalars(
+            select(VirtualCard.card_number).where(VirtualCard.card_number.in_(candidates))
+        ))
+        numbers |= candidates - taken
+        if len(numbers) == count:
+            break
+    else:
+        raise RuntimeError(f'Could not allocate {count} unused card numbers under BIN {card_bin}')
+    return list(numbers)
+
+
+def next_card_number():
+    """Take one pre-checked card number from this process's pool, refilling it by block"""
+    card_bin = _card_bin()
+    with _pool_lock:
+        pool = _pools.setdefault(card_bin, deque())
+        if not pool:
+            pool.extend(allocate(current_app.config['CARD_NUMBER_BLOCK_SIZE']))
+        return pool.popleft()
+
+
+def generate_cvv():
+    return f'{secrets.randbelow(1000):03d}'
+
+
+def default_expiry_date():
+    return (datetime.utcnow() + CARD_VALIDITY).date()
+
+
+def issue_payment_cards(user_ids, card_name='Standard Digital Card', card_type='standard'):
+    """Insert one payment card per user with a single multi-row INSERT. Returns the new card ids."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return []
+
+    numbers = allocate(len(user_ids))
+    expiry_date = default_expiry_date()
+    now = datetime.utcnow()
+    card_ids = db.session.scalars(
+        insert(VirtualCard).returning(VirtualCard.id, sort_by_parameter_order=True),
+        [
+            {
+                'user_id': user_id,
+                'card_purpose': 'payment',
+                'card_type': card_type,
+                'card_name': card_name,
+                'card_number': number,
+                'cvv': generate_cvv(),
+                'expiry_date': expiry_date,
+                'is_active': True,
+                'is_frozen': False,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for user_id, number in zip(user_ids, numbers)
+        ]
+    ).all()
+
+    # Bulk inserts skip the after_insert hook, so store the IBANs in one executemany
+    key = current_app.config['SECRET_KEY']
+    table = VirtualCard.__table__
+    db.session.execute(
+        table.update().where(table.c.id == db.bindparam('card_id')),
+        [{'card_id': card_id, 'iban': derive_iban(card_id, key)} for card_id in card_ids]
+    )
+    return card_ids
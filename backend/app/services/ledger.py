@@ -0,0 +1,246 @@
+"""
+Double-entry ledger.
+
+Every money movement is posted as a journal of append-only ledger entries: the
+source account is debited and the destination account credited by the same
+amount. The AccountBalance projection is folded forward in the same database
+transaction as the posting, and periodic AccountBalanceSnapshot rows let
+``balance_at`` answer historical queries by replaying only the entries after
+the nearest snapshot instead of the whole history.
+
+The external account is the other side of every top-up and card payment, for
+all users. It has no projection row, which would be a single row locked by all
+of those transactions; its balance is summed from the entries when asked for.
+"""
+import uuid
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select
+
+from app.extensions import db
+from app.models.account_balance import AccountBalance, AccountBalanceSnapshot
+from app.models.ledger_entry import LedgerEntry
+from app.utils.upsert import increment_or_insert
+
+WALLET = 'wallet'
+SAVINGS_POCKET = 'savings_pocket'
+BUDGET_CARD = 'budget_card'
+ESCROW = 'escrow'
+EXTERNAL = 'external'
+
+ACCOUNT_TYPES = (WALLET, SAVINGS_POCKET, BUDGET_CARD, ESCROW, EXTERNAL)
+
+DEBIT = 'debit'
+CREDIT = 'credit'
+
+Account = namedtuple('Account', ['type', 'id', 'user_id'])
+
+# One movement of ``amount`` from ``source`` to ``destination``; the optional
+# transaction ids link each side to the user-facing Transaction row it backs
+Posting = namedtuple(
+    'Posting',
+    ['source', 'destination', 'amount', 'source_transaction_id', 'destination_transaction_id'],
+    defaults=(None, None)
+)
+
+# Money entering or leaving the platform (top-ups, card merchants)
+EXTERNAL_ACCOUNT = Account(EXTERNAL, 0, None)
+
+# Account types kept out of the AccountBalance projection
+UNPROJECTED_ACCOUNT_TYPES = (EXTERNAL,)
+
+
+def wallet_account(wallet):
+    return Account(WALLET, wallet.id, wallet.user_id)
+
+
+def savings_pocket_account(pocket):
+    return Account(SAVINGS_POCKET, pocket.id, pocket.user_id)
+
+
+def budget_card_account(card):
+    return Account(BUDGET_CARD, card.id, card.user_id)
+
+
+def escrow_account(order_id):
+    return Account(ESCROW, order_id, None)
+
+
+def _to_decimal(amount):
+    return Decimal(str(amount)).quantize(Decimal('0.01'))
+
+
+def _entry(journal_id, account, direction, amount, entry_type, transaction_id, created_at):
+    return {
+        'journal_id': journal_id,
+        'account_type': account.type,
+        'account_id': account.id,
+        'user_id': account.user_id,
+        'direction': direction,
+        'amount': amount,
+        'currency': 'USD',
+        'entry_type': entry_type,
+        'transaction_id': transaction_id,
+        'created_at': created_at,
+    }
+
+
+def _signed_amount(entry):
+    """SQL expression: the entry's amount, negated for debits"""
+    return case((entry.direction == CREDIT, entry.amount), else_=-entry.amount)
+
+
+def _fold_into_balances(connection, rows, entry_ids, now):
+    accounts = {}
+    for row, entry_id in zip(rows, entry_ids):
+        if row['account_type'] in UNPROJECTED_ACCOUNT_TYPES:
+            continue
+        key = (row['account_type'], row['account_id'])
+        state = accounts.setdefault(key, {'user_id': row['user_id'], 'delta': Decimal('0'), 'count': 0, 'last_entry_id': entry_id})
+        state['delta'] += row['amount'] if row['direction'] == CREDIT else -row['amount']
+        state['count'] += 1
+        state['last_entry_id'] = max(state['last_entry_id'], entry_id)
+
+    table = AccountBalance.__table__
+    for (account_type, account_id), state in accounts.items():
+        last_entry_id = state['last_entry_id']
+        increment_or_insert(
+            connection,
+            table,
+            {'account_type': account_type, 'account_id': account_id},
+            {'balance': state['delta'], 'entry_count': state['count']},
+            extra_values={
+                'last_entry_id': case((table.c.last_entry_id < last_entry_id, last_entry_id), else_=table.c.last_entry_id),
+                'updated_at': now,
+            },
+            insert_values={'user_id': state['user_id'], 'last_entry_id': last_entry_id, 'updated_at': now}
+        )
+
+
+def post(entry_type, postings, journal_id=None, connection=None):
+    """Append one balanced journal for ``postings`` and update the balance projection. Returns the journal id."""
+    journal_id = journal_id or str(uuid.uuid4())
+    now = datetime.utcnow()
+
+    rows = []
+    for posting in postings:
+        amount = _to_decimal(posting.amount)
+        if amount <= 0:
+            raise ValueError('Ledger postings must move a positive amount')
+        if posting.source[:2] == posting.destination[:2]:
+            raise ValueError('Ledger postings must move money between two different accounts')
+        rows.append(_entry(journal_id, posting.source, DEBIT, amount, entry_type, posting.source_transaction_id, now))
+        rows.append(_entry(journal_id, posting.destination, CREDIT, amount, entry_type, posting.destination_transaction_id, now))
+
+    if not rows:
+        return journal_id
+
+    debits = sum(row['amount'] for row in rows if row['direction'] == DEBIT)
+    credits = sum(row['amount'] for row in rows if row['direction'] == CREDIT)
+    if debits != credits:
+        raise ValueError(f'Unbalanced journal {journal_id}: debits {debits} != credits {credits}')
+
+    connection = connection or db.session.connection()
+    table = LedgerEntry.__table__
+    entry_ids = connection.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    _fold_into_balances(connection, rows, entry_ids, now)
+    return journal_id
+
+
+def move(entry_type, source, destination, amount, source_transaction=None, destination_transaction=None):
+    """Post a single movement, linking each side to its (possibly still pending) Transaction row"""
+    if any(t is not None and t.id is None for t in (source_transaction, destination_transaction)):
+        db.session.flush()
+    return post(entry_type, [Posting(
+        source,
+        destination,
+        amount,
+        source_transaction.id if source_transaction is not None else None,
+        destination_transaction.id if destination_transaction is not None else None
+    )])
+
+
+def balance(account_type, account_id):
+    """Current projected balance of an account"""
+    if account_type in UNPROJECTED_ACCOUNT_TYPES:
+        total = db.session.query(func.coalesce(func.sum(_signed_amount(LedgerEntry)), 0)).filter(
+            LedgerEntry.account_type == account_type,
+            LedgerEntry.account_id == account_id
+        ).scalar()
+        return _to_decimal(total)
+    row = db.session.get(AccountBalance, (account_type, account_id))
+    return row.balance if row is not None else Decimal('0.00')
+
+
+def balance_at(account_type, account_id, at):
+    """Balance of an account as of ``at``: the nearest earlier snapshot plus the entries posted after it"""
+    snapshot = AccountBalanceSnapshot.query.filter(
+        AccountBalanceSnapshot.account_type == account_type,
+        AccountBalanceSnapshot.account_id == account_id,
+        AccountBalanceSnapshot.taken_at <= at
+    ).order_by(AccountBalanceSnapshot.taken_at.desc(), AccountBalanceSnapshot.id.desc()).first()
+
+    base = snapshot.balance if snapshot is not None else Decimal('0.00')
+    after_id = snapshot.last_entry_id if snapshot is not None else 0
+
+    delta = db.session.query(func.coalesce(func.sum(_signed_amount(LedgerEntry)), 0)).filter(
+        LedgerEntry.account_type == account_type,
+        LedgerEntry.account_id == account_id,
+        LedgerEntry.id > after_id,
+        LedgerEntry.created_at <= at
+    ).scalar()
+    return _to_decimal(base) + _to_decimal(delta)
+
+
+def take_snapshots(taken_at=None):
+    """Snapshot every account that has moved since its last snapshot. Returns the number of snapshots written."""
+    taken_at = taken_at or datetime.utcnow()
+    latest = select(
+        AccountBalanceSnapshot.account_type,
+        AccountBalanceSnapshot.account_id,
+        func.max(AccountBalanceSnapshot.last_entry_id).label('last_entry_id')
+    ).group_by(AccountBalanceSnapshot.account_type, AccountBalanceSnapshot.account_id).subquery()
+
+    changed = select(
+        AccountBalance.account_type,
+        AccountBalance.account_id,
+        AccountBalance.balance,
+        AccountBalance.last_entry_id,
+        literal(taken_at, type_=db.DateTime)
+    ).outerjoin(latest, and_(
+        latest.c.account_type == AccountBalance.account_type,
+        latest.c.account_id == AccountBalance.account_id
+    )).where(or_(
+        latest.c.last_entry_id.is_(None),
+        AccountBalance.last_entry_id > latest.c.last_entry_id
+    ))
+
+    result = db.session.execute(insert(AccountBalanceSnapshot).from_select(
+        ['account_type', 'account_id', 'balance', 'last_entry_id', 'taken_at'], changed
+    ))
+    return result.rowcount
+
+
+def rebuild_balances():
+    """Recompute the balance projection from the entries. Returns the number of accounts rebuilt."""
+    totals = select(
+        LedgerEntry.account_type,
+        LedgerEntry.account_id,
+        func.max(LedgerEntry.user_id),
+        func.sum(_signed_amount(LedgerEntry)),
+        func.count(LedgerEntry.id),
+        func.max(LedgerEntry.id),
+        literal(datetime.utcnow(), type_=db.DateTime)
+    ).where(
+        LedgerEntry.account_type.not_in(UNPROJECTED_ACCOUNT_TYPES)
+    ).group_by(LedgerEntry.account_type, LedgerEntry.account_id)
+
+    db.session.execute(delete(AccountBalance))
+    result = db.session.execute(insert(AccountBalance).from_select(
+        ['account_type', 'account_id', 'user_id', 'balance', 'entry_count', 'last_entry_id', 'updated_at'], totals
+    ))
+    return result.rowcount
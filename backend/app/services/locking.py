@@ -0,0 +1,62 @@
+"""
+Row locking helpers for operations that touch more than one wallet.
+
+Locking two wallets with separate ``with_for_update()`` calls in caller order
+lets concurrent A->B and B->A operations deadlock on Postgres. ``lock_wallets``
+takes every lock in a single statement ordered by primary key, so all callers
+acquire them in the same global order. ``retry_on_conflict`` re-runs a view
+when the database still aborts the transaction with a serialization failure or
+deadlock.
+"""
+import random
+import time
+from functools import wraps
+
+from flask import current_app, jsonify
+from sqlalchemy.exc import DBAPIError
+
+from app.extensions import db
+from app.models.wallet import Wallet
+
+# Postgres serialization_failure and deadlock_detected
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+
+
+def lock_wallets(*user_ids):
+    """SELECT ... WHERE user_id IN (...) ORDER BY id FOR UPDATE; returns {user_id: Wallet}"""
+    wallets = Wallet.query.filter(
+        Wallet.user_id.in_(set(user_ids))
+    ).order_by(Wallet.id).with_for_update().all()
+    return {wallet.user_id: wallet for wallet in wallets}
+
+
+def is_retryable_error(exc):
+    """True if the database aborted the transaction and it is safe to run it again"""
+    if not isinstance(exc, DBAPIError):
+        return False
+    orig = exc.orig
+    sqlstate = getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+    if sqlstate in RETRYABLE_SQLSTATES:
+        return True
+    # SQLite reports lock contention as a generic OperationalError
+    return 'database is locked' in str(orig)
+
+
+def retry_on_conflict(view):
+    """Re-run the view (with jittered backoff) when it raises a retryable database error"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        attempts = current_app.config['DB_CONFLICT_RETRY_ATTEMPTS']
+        for attempt in range(1, attempts + 1):
+            try:
+                return view(*args, **kwargs)
+            except DBAPIError as e:
+                db.session.rollback()
+                if not is_retryable_error(e):
+                    raise
+                current_app.logger.warning(f"Retryable database conflict in {view.__name__} (attempt {attempt}/{attempts}): {e.orig}")
+                if attempt < attempts:
+                    time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+        return jsonify({'error': 'The request conflicted with a concurrent update. Please retry.'}), 503
+    
+    return wrapper
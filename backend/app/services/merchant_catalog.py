@@ -0,0 +1,130 @@
+"""
+In-process merchant catalog for ``GET /api/isic/merchants``.
+
+Every worker keeps the active merchants in memory. The full list and each
+category slice are encoded to JSON once, with a strong ETag apiece, so the
+endpoint is a dictionary lookup. Serving never runs a query, apart from one
+version check at most every ``MERCHANT_CATALOG_CHECK_SECONDS``.
+
+The ``catalog_versions`` row named ``merchants`` is the single source of
+truth. Any ORM insert, update or delete of a ``Merchant`` bumps it in the same
+flush, and so in the same transaction. Workers that see a new version
+rebuild. The worker that made the write drops its copy at commit.
+"""
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.catalog_version import CatalogVersion
+from app.models.merchant import Merchant, merchant_serializer
+
+CATALOG = 'merchants'
+
+Slice = namedtuple('Slice', ('body', 'etag'))
+
+Catalog = namedtuple('Catalog', ('version', 'all', 'categories', 'empty'))
+
+_CHANGED_KEY = 'merchant_catalog_changed'
+_BUMPED_KEY = 'merchant_catalog_bumped'
+
+
+class _State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.catalog = None
+        self.checked_at = 0.0
+
+
+def _state():
+    state = current_app.extensions.get('merchant_catalog')
+    if state is None:
+        state = current_app.extensions.setdefault('merchant_catalog', _State())
+    return state
+
+
+def _encode(merchants):
+    body = current_app.json.dumps({
+        'merchants': merchant_serializer.many(merchants),
+        'count': len(merchants)
+    }).encode() + b'\n'
+    return Slice(body, hashlib.sha1(body).hexdigest())
+
+
+def _build(version):
+    merchants = Merchant.query.filter_by(is_active=True).order_by(Merchant.id).all()
+    by_category = {}
+    for merchant in merchants:
+        by_category.setdefault(merchant.category, []).append(merchant)
+    return Catalog(
+        version=version,
+        all=_encode(merchants),
+        categories={category: _encode(rows) for category, rows in by_category.items()},
+        empty=_encode([])
+    )
+
+
+def catalog():
+    """The current Catalog, rebuilt when the stored version has moved on"""
+    state = _state()
+    current = state.catalog
+    if current is not None and time.monotonic() - state.checked_at < current_app.config['MERCHANT_CATALOG_CHECK_SECONDS']:
+        return current
+
+    with state.lock:
+        current = state.catalog
+        if current is not None and time.monotonic() - state.checked_at < current_app.config['MERCHANT_CATALOG_CHECK_SECONDS']:
+            return current
+        version = CatalogVersion.current(CATALOG)
+        if current is None or current.version != version:
+            current = state.catalog = _build(version)
+        state.checked_at = time.monotonic()
+        return current
+
+
+def merchants_slice(category=None):
+    """Pre-encoded response body and ETag for all active merchants, or those in ``category``"""
+    current = catalog()
+    if not category:
+        return current.all
+    return current.categories.get(category, current.empty)
+
+
+def invalidate():
+    state = _state()
+    with state.lock:
+        state.catalog = None
+        state.checked_at = 0.0
+
+
+@event.listens_for(Merchant, 'after_insert')
+@event.listens_for(Merchant, 'after_update')
+@event.listens_for(Merchant, 'after_delete')
+def _bump_version(mapper, connection, target):
+    session = Session.object_session(target)
+    # One bump per flush, however many merchants it writes
+    if not session.info.get(_BUMPED_KEY):
+        CatalogVersion.bump(connection, CATALOG)
+        session.info[_BUMPED_KEY] = True
+        session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _end_flush(session, flush_context):
+    session.info.pop(_BUMPED_KEY, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    if session.info.pop(_CHANGED_KEY, False) and has_app_context():
+        invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed(session):
+    session.info.pop(_CHANGED_KEY, None)
+    session.info.pop(_BUMPED_KEY, None)
@@ -0,0 +1,173 @@
+"""
+Application metrics served at ``/metrics``.
+
+Collected in-process (see ``app.utils.metrics``), without any agent or
+external service:
+
+- request counts and latency histograms per blueprint and route, plus
+  in-flight requests per blueprint
+- SQLAlchemy pool size, checked-out and overflow connections, read at scrape time
+- time spent in ``SELECT ... FOR UPDATE`` statements, i.e. waiting for row locks
+- money moved and transactions completed per transaction_type, counted once the
+  database transaction commits. Code paths that bypass the ORM unit of work
+  (bulk inserts) must call ``count_transactions``.
+"""
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from app.extensions import db
+from app.models.transaction import Transaction
+from app.utils.metrics import Registry
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    'unipay_http_requests_total', 'HTTP requests handled',
+    ('blueprint', 'route', 'method', 'status')
+)
+REQUEST_DURATION = registry.histogram(
+    'unipay_http_request_duration_seconds', 'HTTP request latency',
+    ('blueprint', 'route', 'method')
+)
+IN_FLIGHT = registry.gauge(
+    'unipay_http_requests_in_flight', 'HTTP requests currently being handled',
+    ('blueprint',)
+)
+LOCK_WAIT = registry.histogram(
+    'unipay_db_lock_wait_seconds', 'Time spent executing SELECT ... FOR UPDATE, dominated by row lock waits',
+    ('endpoint', 'table'),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+MONEY_MOVED = registry.counter(
+    'unipay_money_moved_total', 'Sum of completed transaction amounts',
+    ('transaction_type', 'currency')
+)
+TRANSACTIONS = registry.counter(
+    'unipay_transactions_total', 'Completed transactions',
+    ('transaction_type',)
+)
+
+
+def _pool_stats():
+    pool = db.engine.pool
+    if not isinstance(pool, QueuePool):
+        # SQLite memory databases use a singleton/static pool with no size limits
+        return {}
+    return {'size': pool.size(), 'checked_out': pool.checkedout(), 'overflow': max(pool.overflow(), 0)}
+
+
+def _pool_gauge(stat):
+    def collect():
+        stats = _pool_stats()
+        return {(): stats[stat]} if stat in stats else {}
+    return collect
+
+
+registry.gauge('unipay_db_pool_size', 'Configured connection pool size', collect=_pool_gauge('size'))
+registry.gauge('unipay_db_pool_checked_out', 'Connections currently checked out of the pool', collect=_pool_gauge('checked_out'))
+registry.gauge('unipay_db_pool_overflow', 'Connections open beyond the pool size', collect=_pool_gauge('overflow'))
+
+
+# --- Requests -----------------------------------------------------------------
+
+def _request_labels():
+    rule = request.url_rule
+    return request.blueprint or 'app', rule.rule if rule is not None else 'unmatched', request.method
+
+
+def _start_request():
+    g._metrics_started = time.perf_counter()
+    g._metrics_blueprint = request.blueprint or 'app'
+    IN_FLIGHT.inc(blueprint=g._metrics_blueprint)
+
+
+def _finish_request(response):
+    started = g.get('_metrics_started')
+    if started is not None:
+        blueprint, route, method = _request_labels()
+        REQUEST_DURATION.observe(time.perf_counter() - started, blueprint=blueprint, route=route, method=method)
+        REQUESTS.inc(blueprint=blueprint, route=route, method=method, status=response.status_code)
+    return response
+
+
+def _teardown_request(exc):
+    blueprint = g.pop('_metrics_blueprint', None)
+    if blueprint is not None:
+        IN_FLIGHT.dec(blueprint=blueprint)
+
+
+# --- Row lock waits -----------------------------------------------------------
+
+def _locking_statement(context):
+    compiled = getattr(context, 'compiled', None)
+    statement = getattr(compiled, 'statement', None)
+    if getattr(statement, '_for_update_arg', None) is None:
+        return None
+    return statement
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is discarded with the statement even when it fails
+    if _locking_statement(context) is not None:
+        context._lock_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    select = _locking_statement(context)
+    started = getattr(context, '_lock_started', None)
+    if select is None or started is None:
+        return
+    froms = select.get_final_froms()
+    table = getattr(froms[0], 'name', 'unknown') if froms else 'unknown'
+    endpoint = (request.endpoint if has_request_context() else None) or 'none'
+    LOCK_WAIT.observe(time.perf_counter() - started, endpoint=endpoint, table=table)
+
+
+# --- Money moved --------------------------------------------------------------
+
+_PENDING_KEY = 'metrics_transactions'
+
+
+def count_transactions(session, transactions):
+    """Count completed transactions inserted outside the unit of work once the session commits"""
+    session.info.setdefault(_PENDING_KEY, []).extend(
+        (t.transaction_type, t.currency, t.amount) for t in transactions if t.status == 'completed'
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_transactions(session, flush_context):
+    completed = [obj for obj in session.new if isinstance(obj, Transaction) and obj.status == 'completed']
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and obj.status == 'completed' and inspect(obj).attrs.status.history.has_changes():
+            completed.append(obj)
+    if completed:
+        count_transactions(session, completed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_transactions(session):
+    for transaction_type, currency, amount in session.info.pop(_PENDING_KEY, ()):
+        TRANSACTIONS.inc(transaction_type=transaction_type)
+        MONEY_MOVED.inc(float(amount or 0), transaction_type=transaction_type, currency=currency or 'USD')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_transactions(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_monitoring(app, engine):
+    """Attach request and lock-wait instrumentation when METRICS_ENABLED is on"""
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,195 @@
+"""
+Bulk user onboarding from CSV or JSON Lines.
+
+Rows are processed in chunks. Each chunk is validated with the same rules as
+``POST /api/auth/register``, checked for taken emails, usernames and phones
+with one ``IN`` query per column, hashed in a process pool, then inserted as
+multi-row INSERTs for users and wallets (plus default payment cards when
+asked) and committed. A bad row is reported and skipped; it never aborts the
+rest of the import.
+"""
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import User, Wallet
+from app.models.user import DEFAULT_PIN
+from app.utils import hashing
+
+FIELDS = ('email', 'username', 'password', 'pin', 'phone', 'first_name', 'last_name', 'university', 'faculty')
+UNIQUE_FIELDS = ('email', 'username', 'phone')
+# Credentials are hashed exactly as given, like ``POST /api/auth/register`` does
+SECRET_FIELDS = ('password', 'pin')
+
+DEFAULT_CARDS = (('Standard Digital Card', 'standard'), ('One-Time Card', 'virtual'))
+
+
+def read_rows(stream, fmt):
+    """Yield (line_number, row) pairs; row is None when the line could not be parsed"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None
+            continue
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _clean(row):
+    cleaned = {}
+    for field in FIELDS:
+        value = row.get(field)
+        if value is not None:
+            value = str(value) if field in SECRET_FIELDS else str(value).strip()
+        cleaned[field] = value or None
+    return cleaned
+
+
+def _validate(row):
+    if not row['email'] or not row['password'] or not row['username']:
+        return 'Missing required fields'
+    if not row['pin']:
+        return 'PIN is required'
+    if not row['pin'].isdigit() or len(row['pin']) != 4:
+        return 'PIN must be exactly 4 digits'
+    return None
+
+
+def _hash_credentials(credentials):
+    # Module-level so the process pool can pickle it
+    password, pin, password_method, pin_method = credentials
+    return hashing.generate(password, password_method), hashing.generate(pin, pin_method)
+
+
+def _taken(field, values):
+    if not values:
+        return set()
+    column = getattr(User, field)
+    return set(db.session.scalars(select(column).where(column.in_(values))))
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.cards_created = 0
+        self.errors = []
+
+    def error(self, line, row, message):
+        self.errors.append({'line': line, 'email': (row or {}).get('email'), 'error': message})
+
+    def to_dict(self):
+        errors = sorted(self.errors, key=lambda e: e['line'])
+        return {'created': self.created, 'cards_created': self.cards_created, 'failed': len(errors), 'errors': errors}
+
+
+def _import_chunk(chunk, seen, pool, create_cards, report):
+    accepted = []
+    for line, raw in chunk:
+        if raw is None:
+            report.error(line, None, 'Could not parse row')
+            continue
+        row = _clean(raw)
+        message = _validate(row)
+        if message is None:
+            for field in UNIQUE_FIELDS:
+                if row[field] and row[field] in seen[field]:
+                    message = f'Duplicate {field} in import file'
+                    break
+        if message:
+            report.error(line, row, message)
+            continue
+        for field in UNIQUE_FIELDS:
+            if row[field]:
+                seen[field].add(row[field])
+        accepted.append((line, row))
+
+    taken = {field: _taken(field, [row[field] for _, row in accepted if row[field]]) for field in UNIQUE_FIELDS}
+    rows = []
+    for line, row in accepted:
+        field = next((f for f in UNIQUE_FIELDS if row[f] and row[f] in taken[f]), None)
+        if field == 'email':
+            report.error(line, row, 'Email already registered')
+        elif field == 'username':
+            report.error(line, row, 'Username already taken')
+        elif field == 'phone':
+            report.error(line, row, 'Phone already registered')
+        else:
+            rows.append((line, row))
+    if not rows:
+        return
+
+    password_method, pin_method = hashing.method_for('password'), hashing.method_for('pin')
+    credentials = [(row['password'], row['pin'], password_method, pin_method) for _, row in rows]
+    hashes = pool.map(_hash_credentials, credentials, chunksize=16) if pool else map(_hash_credentials, credentials)
+
+    now = datetime.utcnow()
+    user_rows = []
+    for (_, row), (password_hash, pin_hash) in zip(rows, hashes):
+        user_rows.append({
+            **{field: row[field] for field in FIELDS if field not in ('password', 'pin')},
+            'password_hash': password_hash,
+            'pin_hash': pin_hash,
+            'pin_is_default': row['pin'] == DEFAULT_PIN,
+            'created_at': now,
+            'updated_at': now,
+        })
+
+    try:
+        _insert(user_rows, create_cards, now, report)
+    except IntegrityError:
+        # Someone registered one of these identities after the uniqueness check; find the
+        # conflicting rows one at a time so the rest of the chunk is still imported
+        db.session.rollback()
+        for (line, row), user_row in zip(rows, user_rows):
+            try:
+                _insert([user_row], create_cards, now, report)
+            except IntegrityError as e:
+                db.session.rollback()
+                report.error(line, row, f'Rejected by the database: {e.orig}')
+
+
+def _insert(user_rows, create_cards, now, report):
+    user_ids = db.session.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), user_rows).all()
+    db.session.execute(insert(Wallet), [{'user_id': user_id, 'created_at': now, 'updated_at': now} for user_id in user_ids])
+    cards = 0
+    if create_cards:
+        from app.services import card_numbers
+        for card_name, card_type in DEFAULT_CARDS:
+            cards += len(card_numbers.issue_payment_cards(user_ids, card_name=card_name, card_type=card_type))
+    db.session.commit()
+
+    report.created += len(user_ids)
+    report.cards_created += cards
+
+
+def import_users(rows, chunk_size=500, workers=None, create_cards=False):
+    """Import (line_number, row) pairs from ``read_rows``. Returns an ImportReport."""
+    report = ImportReport()
+    seen = {field: set() for field in UNIQUE_FIELDS}
+    workers = workers if workers is not None else current_app.config['ONBOARDING_HASH_WORKERS']
+
+    with (ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()) as pool:
+        chunk = []
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                _import_chunk(chunk, seen, pool, create_cards, report)
+                chunk = []
+        if chunk:
+            _import_chunk(chunk, seen, pool, create_cards, report)
+    return report
@@ -0,0 +1,101 @@
+"""
+Real-time wallet and transaction push.
+
+Clients connect to Socket.IO with their access token (``auth={'token': ...}``
+or ``?token=``) and are joined to a private ``user:<id>`` room. Wallet balance
+changes and new Transaction rows are collected from every flush and only
+published once the surrounding database transaction commits, so a rolled
+back request never announces money that did not move. Code paths that bypass
+the ORM unit of work (bulk inserts) must call ``queue_transactions``.
+
+Events:
+    wallet.updated       {'wallet': Wallet.to_dict()}
+    transaction.created  {'transaction': Transaction.to_dict()}
+"""
+from flask import current_app, request
+from flask_jwt_extended import decode_token
+from flask_socketio import join_room
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import socketio
+from app.models.transaction import Transaction
+from app.models.wallet import Wallet
+
+WALLET_UPDATED = 'wallet.updated'
+TRANSACTION_CREATED = 'transaction.created'
+
+_PENDING_KEY = 'realtime_events'
+
+
+def user_room(user_id):
+    return f'user:{user_id}'
+
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    token = (auth or {}).get('token') if isinstance(auth, dict) else None
+    token = token or request.args.get('token')
+    if not token:
+        return False
+
+    try:
+        claims = decode_token(token)
+    except Exception:
+        return False
+
+    if claims.get('type') != 'access':
+        return False
+
+    # decode_token does not consult the blocklist
+    from app.services.token_revocation import is_revoked
+    if is_revoked(claims['jti']):
+        return False
+
+    join_room(user_room(claims['sub']))
+
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, {'wallets': {}, 'transactions': []})
+
+
+def queue_transactions(session, transactions):
+    """Publish ``transaction.created`` for rows inserted outside the unit of work once the session commits"""
+    _pending(session)['transactions'].extend(
+        (t.user_id, {'transaction': t.to_dict()}) for t in transactions
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_events(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            _pending(session)['transactions'].append((obj.user_id, {'transaction': obj.to_dict()}))
+        elif isinstance(obj, Wallet):
+            _pending(session)['wallets'][obj.id] = (obj.user_id, {'wallet': obj.to_dict()})
+
+    for obj in session.dirty:
+        if isinstance(obj, Wallet) and inspect(obj).attrs.balance.history.has_changes():
+            # Keyed by wallet so several flushes in one transaction push only the final balance
+            _pending(session)['wallets'][obj.id] = (obj.user_id, {'wallet': obj.to_dict()})
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_events(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    try:
+        for user_id, payload in pending['transactions']:
+            socketio.emit(TRANSACTION_CREATED, payload, to=user_room(user_id))
+        for user_id, payload in pending['wallets'].values():
+            socketio.emit(WALLET_UPDATED, payload, to=user_room(user_id))
+    except Exception as e:
+        # The money already moved; a failed push only means clients fall back to polling
+        current_app.logger.warning(f'Real-time publish failed: {str(e)}')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_events(session):
+    session.info.pop(_PENDING_KEY, None)
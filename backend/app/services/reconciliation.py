@@ -0,0 +1,176 @@
+"""
+Wallet reconciliation.
+
+Proves ``Wallet.balance`` against the history that should have produced it.
+Completed transactions are streamed in id order through a server-side cursor
+and folded into per-user ReconciliationCheckpoint rows (net wallet effect,
+row count, last transaction id seen). Each wallet is then compared with its
+checkpoint and with the ledger's projected balance in a second streamed pass.
+
+An incremental run only scans transactions after the highest checkpointed id.
+Ids are handed out before commit, so a row can become visible after a higher
+id was already read. Checkpoints therefore stop short of the first row created
+within the last ``lag_seconds``. Rows past that point are scanned again on
+every run and added to that run's report without being checkpointed. A write
+that takes longer than the lag to commit can still be missed. Rows edited or
+deleted after being checkpointed are only picked up by a full run, so the
+nightly job should still do a full pass now and then.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, delete, func, insert, select
+
+from app.extensions import db
+from app.models.account_balance import AccountBalance
+from app.models.reconciliation_checkpoint import ReconciliationCheckpoint
+from app.models.transaction import Transaction
+from app.models.wallet import Wallet
+from app.services import ledger
+from app.utils.transaction_types import wallet_effect
+from app.utils.upsert import increment_or_insert
+
+REPORT_FIELDS = (
+    'user_id',
+    'wallet_id',
+    'wallet_balance',
+    'transaction_net',
+    'transaction_count',
+    'ledger_balance',
+    'drift',
+    'ledger_drift',
+)
+
+
+def _new_total():
+    return {'net': Decimal('0'), 'count': 0, 'last_id': 0}
+
+
+def _safe_id(after_id, lag_seconds):
+    """Highest id that can be checkpointed: just below the first transaction created within the lag, if any"""
+    cutoff = datetime.utcnow() - timedelta(seconds=lag_seconds)
+    first_recent = db.session.query(func.min(Transaction.id)).filter(
+        Transaction.id > after_id,
+        Transaction.created_at > cutoff
+    ).scalar()
+    return first_recent - 1 if first_recent is not None else None
+
+
+def _scan_transactions(after_id, safe_id, batch_size):
+    """
+    Fold completed transactions with id > after_id into per-user totals in one streamed pass.
+    Rows above ``safe_id`` go into a separate set of pending totals.
+    """
+    query = select(
+        Transaction.id,
+        Transaction.user_id,
+        Transaction.transaction_type,
+        Transaction.amount,
+        Transaction.sender_id,
+        Transaction.receiver_id
+    ).where(
+        Transaction.status == 'completed',
+        Transaction.id > after_id
+    ).order_by(Transaction.id).execution_options(yield_per=batch_size)
+
+    totals = defaultdict(_new_total)
+    pending = defaultdict(_new_total)
+    scanned = 0
+    last_id = after_id
+    for row in db.session.execute(query):
+        if safe_id is not None and row.id > safe_id:
+            total = pending[row.user_id]
+        else:
+            total = totals[row.user_id]
+            last_id = row.id
+        total['net'] += wallet_effect(row.transaction_type, row.user_id, row.sender_id, row.receiver_id) * Decimal(str(row.amount))
+        total['count'] += 1
+        total['last_id'] = row.id
+        scanned += 1
+    return totals, pending, scanned, last_id
+
+
+def refresh_checkpoints(incremental=False, batch_size=1000, lag_seconds=300):
+    """
+    Bring checkpoints up to date. Returns (transactions scanned, highest transaction id checkpointed,
+    pending totals); pass the pending totals on to ``iter_report``.
+    """
+    after_id = 0
+    if incremental:
+        after_id = db.session.query(func.max(ReconciliationCheckpoint.last_transaction_id)).scalar() or 0
+
+    totals, pending, scanned, last_id = _scan_transactions(after_id, _safe_id(after_id, lag_seconds), batch_size)
+    now = datetime.utcnow()
+    table = ReconciliationCheckpoint.__table__
+
+    if not incremental:
+        db.session.execute(delete(ReconciliationCheckpoint))
+        rows = [
+            {
+                'user_id': user_id,
+                'transaction_net': total['net'],
+                'transaction_count': total['count'],
+                'last_transaction_id': total['last_id'],
+                'updated_at': now,
+            }
+            for user_id, total in totals.items()
+        ]
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(insert(ReconciliationCheckpoint), rows[start:start + batch_size])
+        return scanned, last_id, pending
+
+    connection = db.session.connection()
+    for user_id, total in totals.items():
+        increment_or_insert(
+            connection,
+            table,
+            {'user_id': user_id},
+            {'transaction_net': total['net'], 'transaction_count': total['count']},
+            extra_values={'last_transaction_id': total['last_id'], 'updated_at': now},
+            insert_values={'last_transaction_id': total['last_id'], 'updated_at': now}
+        )
+    return scanned, last_id, pending
+
+
+def iter_report(include_all=False, batch_size=1000, pending=None):
+    """
+    Yield one report row per wallet (only drifted wallets unless include_all), streamed in user order.
+    ``pending`` holds the not yet checkpointed totals from ``refresh_checkpoints``.
+    """
+    pending = pending or {}
+    query = select(
+        Wallet.user_id,
+        Wallet.id,
+        Wallet.balance,
+        ReconciliationCheckpoint.transaction_net,
+        ReconciliationCheckpoint.transaction_count,
+        AccountBalance.balance
+    ).outerjoin(
+        ReconciliationCheckpoint, ReconciliationCheckpoint.user_id == Wallet.user_id
+    ).outerjoin(
+        AccountBalance, and_(AccountBalance.account_type == ledger.WALLET, AccountBalance.account_id == Wallet.id)
+    ).order_by(Wallet.user_id).execution_options(yield_per=batch_size)
+
+    for user_id, wallet_id, balance, net, count, ledger_balance in db.session.execute(query):
+        balance = Decimal(str(balance))
+        net = Decimal(str(net or 0))
+        count = count or 0
+        if user_id in pending:
+            net += pending[user_id]['net']
+            count += pending[user_id]['count']
+        ledger_balance = Decimal(str(ledger_balance or 0))
+        drift = balance - net
+        ledger_drift = balance - ledger_balance
+        if not include_all and not drift and not ledger_drift:
+            continue
+        yield {
+            'user_id': user_id,
+            'wallet_id': wallet_id,
+            'wallet_balance': float(balance),
+            'transaction_net': float(net),
+            'transaction_count': count,
+            'ledger_balance': float(ledger_balance),
+            'drift': float(drift),
+            'ledger_drift': float(ledger_drift),
+        }
@@ -0,0 +1,124 @@
+"""
+Brute-force protection for login and PIN checks.
+
+Failed attempts are counted per account and per client IP in sliding windows
+(``LOGIN_RATE_LIMIT_ACCOUNT``, ``LOGIN_RATE_LIMIT_IP``, ``PIN_RATE_LIMIT_USER``,
+``PIN_RATE_LIMIT_IP``, each ``"<attempts>/<seconds>"``). Callers ask for a
+``retry_after`` before verifying anything, so a locked-out account or address
+is turned away with 429 before a password or PIN hash is computed. A
+successful login or PIN check clears that account's failures.
+"""
+from flask import current_app, jsonify, request
+
+from app.services.monitoring import registry
+from app.utils.rate_limit import SlidingWindow, make_backend, parse_rate
+
+THROTTLED = registry.counter(
+    'unipay_auth_throttled_total', 'Login and PIN attempts rejected by rate limiting',
+    ('scope',)
+)
+FAILURES = registry.counter(
+    'unipay_auth_failures_total', 'Failed login and PIN attempts',
+    ('scope',)
+)
+
+_CONFIG = {
+    'login_account': 'LOGIN_RATE_LIMIT_ACCOUNT',
+    'login_ip': 'LOGIN_RATE_LIMIT_IP',
+    'pin_user': 'PIN_RATE_LIMIT_USER',
+    'pin_ip': 'PIN_RATE_LIMIT_IP',
+}
+
+
+def _limiters():
+    limiters = current_app.extensions.get('throttling')
+    if limiters is None:
+        backend = make_backend(current_app.config['RATE_LIMIT_STORAGE_URL'])
+        limiters = {
+            scope: SlidingWindow(backend, scope, *parse_rate(current_app.config[key]))
+            for scope, key in _CONFIG.items()
+        }
+        current_app.extensions['throttling'] = limiters
+    return limiters
+
+
+def _locked_keys():
+    limiters = current_app.extensions.get('throttling') or {}
+    counts = {}
+    for scope, limiter in limiters.items():
+        locked = limiter.locked_keys()
+        if locked is not None:
+            counts[(scope,)] = locked
+    return counts
+
+
+registry.gauge(
+    'unipay_auth_locked_out', 'Accounts and addresses currently over a login or PIN limit (in-memory storage only)',
+    ('scope',), collect=_locked_keys
+)
+
+
+def _client_ip():
+    return request.remote_addr or 'unknown'
+
+
+def _retry_after(keys):
+    if not current_app.config['RATE_LIMIT_ENABLED']:
+        return 0
+    limiters = _limiters()
+    for scope, key in keys:
+        wait = limiters[scope].retry_after(key)
+        if wait:
+            THROTTLED.inc(scope=scope)
+            return wait
+    return 0
+
+
+def _record_failure(keys):
+    FAILURES.inc(scope=keys[0][0].split('_')[0])
+    if not current_app.config['RATE_LIMIT_ENABLED']:
+        return
+    limiters = _limiters()
+    for scope, key in keys:
+        limiters[scope].hit(key)
+
+
+def _login_keys(email):
+    return [('login_account', email.strip().lower()), ('login_ip', _client_ip())]
+
+
+def _pin_keys(user_id):
+    return [('pin_user', str(user_id)), ('pin_ip', _client_ip())]
+
+
+def login_retry_after(email):
+    return _retry_after(_login_keys(email))
+
+
+def record_login_failure(email):
+    _record_failure(_login_keys(email))
+
+
+def reset_login(email):
+    if current_app.config['RATE_LIMIT_ENABLED']:
+        _limiters()['login_account'].reset(email.strip().lower())
+
+
+def check_pin(user, pin):
+    """Verify ``user``'s PIN under the PIN limits. Returns (valid, retry_after); retry_after > 0 means not checked."""
+    keys = _pin_keys(user.id)
+    wait = _retry_after(keys)
+    if wait:
+        return False, wait
+    if not user.check_pin(pin):
+        _record_failure(keys)
+        return False, 0
+    if current_app.config['RATE_LIMIT_ENABLED']:
+        _limiters()['pin_user'].reset(str(user.id))
+    return True, 0
+
+
+def too_many_attempts(retry_after):
+    response = jsonify({'error': 'Too many failed attempts. Try again later.', 'retry_after': retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
@@ -0,0 +1,135 @@
+"""
+JWT revocation (logout) without a database round trip per request.
+
+Revoked token ids (``jti``) are stored in ``revoked_tokens`` until the token
+would have expired anyway. Each worker process mirrors the unexpired ids in a
+Bloom filter:
+
+- a token whose jti is not in the filter is accepted. That is the common
+  case, and it costs a few hashes in memory.
+- a jti that is in the filter is confirmed against the table, because the
+  filter has rare false positives.
+
+Revocations made by this process enter its filter immediately. Every
+``TOKEN_REVOCATION_SYNC_SECONDS`` the filter picks up rows added by other
+workers. So a token revoked elsewhere can still work for up to that long.
+
+The filter is rebuilt from unexpired rows every
+``TOKEN_REVOCATION_REBUILD_SECONDS``, or sooner when it fills up. Expired
+revocations drop out at each rebuild. A rebuild also picks up any row whose id
+was committed out of order and so was missed by the incremental sync.
+``flask purge-revoked-tokens`` deletes rows for expired tokens.
+"""
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.revoked_token import RevokedToken
+from app.utils.bloom import BloomFilter
+
+BLOOM_ERROR_RATE = 0.001
+
+# Stored for tokens issued without an expiry
+_NEVER = datetime(9999, 12, 31)
+
+
+class _Denylist:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.confirmed = set()
+        self.last_id = 0
+        self.synced_at = 0.0
+        self.built_at = 0.0
+
+
+def _state():
+    state = current_app.extensions.get('token_revocation')
+    if state is None:
+        state = current_app.extensions.setdefault('token_revocation', _Denylist())
+    return state
+
+
+def _rebuild(state, now):
+    last_id = db.session.scalar(select(func.max(RevokedToken.id))) or 0
+    jtis = db.session.scalars(
+        select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.utcnow(), RevokedToken.id <= last_id)
+    ).all()
+    # Leave room to grow so a busy period does not force a rebuild on every sync
+    capacity = max(current_app.config['TOKEN_REVOCATION_BLOOM_CAPACITY'], 2 * len(jtis))
+    bloom = BloomFilter(capacity, BLOOM_ERROR_RATE)
+    for jti in jtis:
+        bloom.add(jti)
+    state.bloom, state.confirmed, state.last_id = bloom, set(), last_id
+    state.synced_at = state.built_at = now
+
+
+def _sync(state):
+    now = time.monotonic()
+    config = current_app.config
+    if state.bloom is not None and now - state.synced_at < config['TOKEN_REVOCATION_SYNC_SECONDS']:
+        return
+    with state.lock:
+        if state.bloom is None or state.bloom.is_full or now - state.built_at >= config['TOKEN_REVOCATION_REBUILD_SECONDS']:
+            _rebuild(state, now)
+        elif now - state.synced_at >= config['TOKEN_REVOCATION_SYNC_SECONDS']:
+            rows = db.session.execute(
+                select(RevokedToken.id, RevokedToken.jti).where(RevokedToken.id > state.last_id)
+            ).all()
+            for row_id, jti in rows:
+                state.bloom.add(jti)
+                state.last_id = max(state.last_id, row_id)
+            state.synced_at = now
+
+
+def is_revoked(jti):
+    state = _state()
+    _sync(state)
+    if jti not in state.bloom:
+        return False
+    if jti in state.confirmed:
+        return True
+    revoked = db.session.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti)) is not None
+    if revoked:
+        state.confirmed.add(jti)
+    return revoked
+
+
+def revoke(claims):
+    """Revoke the decoded token ``claims`` until its own expiry. Commits."""
+    jti = claims['jti']
+    expires_at = datetime.utcfromtimestamp(claims['exp']) if 'exp' in claims else _NEVER
+    db.session.add(RevokedToken(
+        jti=jti,
+        token_type=claims.get('type', 'access'),
+        user_id=int(claims['sub']),
+        expires_at=expires_at
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # already revoked
+
+    state = _state()
+    with state.lock:
+        if state.bloom is not None:
+            state.bloom.add(jti)
+        state.confirmed.add(jti)
+
+
+def purge_expired():
+    """Delete revocations for tokens past their expiry. Returns the number of rows removed."""
+    count = RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete()
+    db.session.commit()
+    return count
+
+
+def init_token_revocation(jwt):
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return is_revoked(jwt_payload['jti'])
@@ -0,0 +1,190 @@
+"""
+Per-user transaction aggregates.
+
+Every insert, update or delete of a Transaction row is folded into the user's
+TransactionAggregate row from an ``after_flush`` hook, so the running totals are
+written in the same database transaction as the ledger write that produced them.
+Code paths that bypass the ORM unit of work (bulk inserts) must call
+``apply_transaction_rows`` themselves.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import event, func, case, delete, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.transaction import Transaction
+from app.models.transaction_aggregate import TransactionAggregate
+from app.utils.upsert import increment_or_insert, insert_if_absent
+from app.utils.transaction_types import INFLOW, OUTFLOW, direction_of, inflow_amount, outflow_amount
+
+_TRACKED_ATTRIBUTES = ('user_id', 'transaction_type', 'amount', 'created_at', 'sender_id', 'receiver_id')
+
+_BUCKETS = {INFLOW: 'total_income', OUTFLOW: 'total_expenses'}
+
+
+def _new_delta():
+    return {'total_income': Decimal('0'), 'total_expenses': Decimal('0'), 'transaction_count': 0, 'last_transaction_at': None}
+
+
+def _naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _accumulate(deltas, row, sign):
+    user_id = row['user_id']
+    if user_id is None:
+        return
+    created_at = _naive_utc(row.get('created_at'))
+    amount = row['amount']
+    delta = deltas[user_id]
+    delta['transaction_count'] += sign
+    bucket = _BUCKETS.get(direction_of(row['transaction_type'], user_id, row.get('sender_id'), row.get('receiver_id')))
+    if bucket and amount is not None:
+        delta[bucket] += sign * Decimal(str(amount))
+    if sign > 0 and created_at is not None:
+        if delta['last_transaction_at'] is None or created_at > delta['last_transaction_at']:
+            delta['last_transaction_at'] = created_at
+
+
+def _apply_deltas(connection, deltas):
+    table = TransactionAggregate.__table__
+    now = datetime.utcnow()
+
+    for user_id, delta in deltas.items():
+        if not delta['transaction_count'] and not delta['total_income'] and not delta['total_expenses']:
+            continue
+
+        last_at = delta['last_transaction_at']
+        extra_values = {'updated_at': now}
+        if last_at is not None:
+            extra_values['last_transaction_at'] = case(
+                (table.c.last_transaction_at.is_(None), last_at),
+                (table.c.last_transaction_at < last_at, last_at),
+                else_=table.c.last_transaction_at
+            )
+
+        increment_or_insert(
+            connection,
+            table,
+            {'user_id': user_id},
+            {
+                'total_income': delta['total_income'],
+                'total_expenses': delta['total_expenses'],
+                'transaction_count': delta['transaction_count'],
+            },
+            extra_values=extra_values,
+            insert_values={'last_transaction_at': last_at, 'updated_at': now}
+        )
+
+
+def _as_row(obj):
+    return {name: getattr(obj, name) for name in _TRACKED_ATTRIBUTES}
+
+
+def apply_transaction_rows(connection, rows, sign=1):
+    """Fold plain transaction rows (dicts keyed like Transaction columns) into the aggregates"""
+    deltas = defaultdict(_new_delta)
+    for row in rows:
+        _accumulate(deltas, row, sign)
+    _apply_deltas(connection, deltas)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_transaction_writes(session, flush_context):
+    deltas = defaultdict(_new_delta)
+
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            _accumulate(deltas, _as_row(obj), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            _accumulate(deltas, _as_row(obj), -1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Transaction):
+            continue
+        state = inspect(obj)
+        histories = {name: state.attrs[name].history for name in _TRACKED_ATTRIBUTES}
+        if not any(h.has_changes() for h in histories.values()):
+            continue
+        old = {
+            name: (h.deleted[0] if h.deleted else getattr(obj, name))
+            for name, h in histories.items()
+        }
+        _accumulate(deltas, old, -1)
+        _accumulate(deltas, _as_row(obj), 1)
+
+    if deltas:
+        _apply_deltas(session.connection(), deltas)
+
+
+def _aggregate_rows(connection, user_ids=None):
+    query = select(
+        Transaction.user_id,
+        func.coalesce(func.sum(inflow_amount(Transaction)), 0),
+        func.coalesce(func.sum(outflow_amount(Transaction)), 0),
+        func.count(Transaction.id),
+        func.max(Transaction.created_at)
+    ).group_by(Transaction.user_id)
+    if user_ids is not None:
+        query = query.where(Transaction.user_id.in_(user_ids))
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'user_id': user_id,
+            'total_income': income,
+            'total_expenses': expenses,
+            'transaction_count': count,
+            'last_transaction_at': last_at,
+            'updated_at': now,
+        }
+        for user_id, income, expenses, count, last_at in connection.execute(query)
+    ]
+
+    if user_ids is not None:
+        rebuilt = {row['user_id'] for row in rows}
+        rows.extend(
+            {
+                'user_id': user_id,
+                'total_income': 0,
+                'total_expenses': 0,
+                'transaction_count': 0,
+                'last_transaction_at': None,
+                'updated_at': now,
+            }
+            for user_id in set(user_ids) - rebuilt
+        )
+    return rows
+
+
+def rebuild(user_ids=None):
+    """Recompute aggregates from raw transaction rows. Returns the number of users rebuilt."""
+    rows = _aggregate_rows(db.session.connection(), user_ids)
+
+    clear = delete(TransactionAggregate)
+    if user_ids is not None:
+        clear = clear.where(TransactionAggregate.user_id.in_(user_ids))
+
+    db.session.execute(clear)
+    if rows:
+        db.session.execute(insert(TransactionAggregate), rows)
+    return len(rows)
+
+
+def get_or_build(user_id):
+    """Return the user's aggregate row, backfilling it from raw rows on first access"""
+    aggregate = db.session.get(TransactionAggregate, user_id)
+    if aggregate is None:
+        # Backfill in its own short transaction so a read never commits the caller's session. A
+        # concurrent backfill or ledger write may create the row first; then that row is kept.
+        with db.engine.begin() as connection:
+            insert_if_absent(connection, TransactionAggregate.__table__, _aggregate_rows(connection, [user_id]), ['user_id'])
+        aggregate = db.session.get(TransactionAggregate, user_id)
+    return aggregate
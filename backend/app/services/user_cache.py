@@ -0,0 +1,115 @@
+"""
+Cached user summaries: the few user fields that views read on almost every
+request (username, email, is_active and the PIN flags).
+
+Lookups go through two layers:
+
+- a request-scoped map on ``flask.g``, so repeated lookups within one request
+  cost nothing, even after a commit has expired the ORM objects
+- a per-process LRU cache with a short TTL (``USER_CACHE_SIZE``,
+  ``USER_CACHE_TTL``), so hot users are not reloaded on every request
+
+Misses are loaded with a single query over just these columns. Any ORM update
+or delete of a ``User`` (profile edits, PIN changes, deactivation) drops the
+entry once the transaction commits. Other workers keep their copy until the
+TTL expires. Views that need password or PIN hashes still load the full
+``User`` row.
+"""
+from collections import namedtuple
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.user import User
+from app.utils.ttl_cache import TTLCache
+
+UserSummary = namedtuple('UserSummary', ('id', 'username', 'email', 'is_active', 'has_pin', 'pin_is_default'))
+
+_COLUMNS = (User.id, User.username, User.email, User.is_active, User.pin_hash.is_not(None), User.pin_is_default)
+
+_INVALIDATE_KEY = 'user_cache_invalidate'
+
+
+def _cache():
+    if not current_app.config['USER_CACHE_TTL']:
+        return None
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        cache = TTLCache(current_app.config['USER_CACHE_SIZE'], current_app.config['USER_CACHE_TTL'])
+        current_app.extensions['user_cache'] = cache
+    return cache
+
+
+def _request_map():
+    # flask.g lives as long as the app context, which is one request when serving
+    if not has_app_context():
+        return {}
+    if '_user_summaries' not in g:
+        g._user_summaries = {}
+    return g._user_summaries
+
+
+def get_summaries(user_ids):
+    """Return {user_id: UserSummary} for the given ids; unknown ids are left out"""
+    found = {}
+    request_map = _request_map()
+    cache = _cache()
+    missing = []
+    for user_id in set(user_ids):
+        summary = request_map.get(user_id)
+        if summary is None and cache is not None:
+            summary = cache.get(user_id)
+        if summary is None:
+            missing.append(user_id)
+        else:
+            found[user_id] = summary
+
+    if missing:
+        for row in db.session.execute(select(*_COLUMNS).where(User.id.in_(missing))):
+            summary = UserSummary(*row)
+            found[summary.id] = summary
+            if cache is not None:
+                cache.set(summary.id, summary)
+
+    request_map.update(found)
+    return found
+
+
+def get_summary(user_id):
+    return get_summaries([user_id]).get(user_id)
+
+
+def username(user_id):
+    summary = get_summary(user_id)
+    return summary.username if summary else None
+
+
+def invalidate(user_id):
+    _request_map().pop(user_id, None)
+    cache = _cache()
+    if cache is not None:
+        cache.pop(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _mark_changed(mapper, connection, target):
+    _request_map().pop(target.id, None)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(_INVALIDATE_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    user_ids = session.info.pop(_INVALIDATE_KEY, ())
+    if user_ids and has_app_context():
+        for user_id in user_ids:
+            invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed(session):
+    session.info.pop(_INVALIDATE_KEY, None)
@@ -0,0 +1,79 @@
+"""
+Authorization claims signed into access tokens.
+
+Access tokens carry ``is_active``, ``wallet_id``, ``role`` and ``pin_set``,
+taken from the user at login, registration and ``POST /api/auth/refresh``.
+``@claims_required()`` authorizes a request from those claims alone, so a
+view that only needs to know the caller is active, an admin or has a PIN does
+not load the user row.
+
+Claims are as fresh as the access token (``JWT_ACCESS_TOKEN_EXPIRES``).
+Endpoints that change them hand back a new access token, and refresh always
+re-reads the user. Tokens issued before claims existed fall back to one user
+lookup per request.
+"""
+from functools import wraps
+
+from flask import g, jsonify
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt, verify_jwt_in_request
+
+from app.extensions import db
+
+CLAIM_KEYS = ('is_active', 'wallet_id', 'role', 'pin_set')
+
+
+def role_for(user):
+    return 'admin' if getattr(user, 'is_admin', False) else 'student'
+
+
+def claims_for(user, wallet=None):
+    wallet = wallet or user.wallet
+    return {
+        'is_active': bool(user.is_active),
+        'wallet_id': wallet.id if wallet else None,
+        'role': role_for(user),
+        'pin_set': user.pin_hash is not None,
+    }
+
+
+def access_token_for(user, wallet=None):
+    return create_access_token(identity=str(user.id), additional_claims=claims_for(user, wallet))
+
+
+def tokens_for(user, wallet=None):
+    """(access_token, refresh_token) for ``user``; the refresh token carries no claims, refresh re-reads them"""
+    return access_token_for(user, wallet), create_refresh_token(identity=str(user.id))
+
+
+def current_claims():
+    """Claims of the verified token, or None if it predates claims and its user no longer exists"""
+    claims = get_jwt()
+    if all(key in claims for key in CLAIM_KEYS):
+        return claims
+    if '_legacy_claims' not in g:
+        from app.models import User
+        user = db.session.get(User, int(claims['sub']))
+        g._legacy_claims = claims_for(user) if user else None
+    return g._legacy_claims
+
+
+def claims_required(role=None, pin_set=False):
+    """Like ``@jwt_required()``, and also rejects deactivated accounts, other roles and (if asked) users without a PIN"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            claims = current_claims()
+
+            if claims is None:
+                return jsonify({'error': 'User not found'}), 404
+            if not claims['is_active']:
+                return jsonify({'error': 'Account is deactivated'}), 403
+            if role is not None and claims['role'] != role:
+                return jsonify({'error': 'Unauthorized'}), 403
+            if pin_set and not claims['pin_set']:
+                return jsonify({'error': 'PIN is not set'}), 403
+
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,39 @@
+"""
+A fixed-size Bloom filter for string keys.
+
+``key in bloom`` is never wrong when it says no. It says yes for keys that
+were never added with probability ``error_rate`` once ``capacity`` keys have
+been added, and more often beyond that. Keys cannot be removed, so rebuild the
+filter once it holds many dead keys.
+"""
+import hashlib
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: the k positions are h1 + i*h2 over one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def is_full(self):
+        return self.count >= self.capacity
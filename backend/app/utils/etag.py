@@ -0,0 +1,55 @@
+"""
+Conditional GET for endpoints that clients poll.
+
+``@conditional(version)`` tags each response with a weak ETag built from the
+caller, the request URL and a version row. ``version(user_id)`` returns SQL
+expressions that change whenever the payload could; usually that is
+``row_version`` (row count and latest ``updated_at``) for each table the
+view reads. The version is read in one query before the view runs. When
+``If-None-Match`` already holds the tag, the response is an empty 304 and the
+view is never called.
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import func, select
+
+from app.extensions import db
+
+
+def row_version(model, *criteria):
+    """(row count, latest updated_at) of the ``model`` rows matching ``criteria``, as scalar subqueries"""
+    return (
+        select(func.count()).select_from(model).where(*criteria).scalar_subquery(),
+        select(func.max(model.updated_at)).where(*criteria).scalar_subquery(),
+    )
+
+
+def _etag(user_id, version):
+    key = repr((request.path, sorted(request.args.items(multi=True)), user_id, tuple(version)))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional(version):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = int(get_jwt_identity())
+            row = db.session.execute(select(*version(user_id))).one()
+            etag = _etag(user_id, row)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            # Clients may keep the body but must revalidate it every time; shared caches must not store it
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
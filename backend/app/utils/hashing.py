@@ -0,0 +1,121 @@
+"""
+Password and PIN hashing.
+
+The algorithm and cost come from config (``PASSWORD_HASH_METHOD`` and
+``PIN_HASH_METHOD``). Either use a werkzeug method string such as
+``scrypt:32768:8:1`` or ``pbkdf2:sha256:600000``, or
+``argon2:<time_cost>:<memory_kib>:<parallelism>`` when argon2-cffi is
+installed.
+
+Hashes are computed on a bounded pool of ``PASSWORD_HASH_WORKERS`` OS
+threads. hashlib's scrypt and pbkdf2 release the GIL, so a burst of logins
+queues for a fixed number of cores instead of stalling every request thread.
+Under gevent the hub's native thread pool is used, so the event loop keeps
+serving other greenlets while a hash runs.
+
+``needs_rehash`` reports hashes made with other parameters, so a successful
+login can upgrade them transparently.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    import argon2
+except ImportError:  # optional
+    argon2 = None
+
+_METHOD_CONFIG = {'password': 'PASSWORD_HASH_METHOD', 'pin': 'PIN_HASH_METHOD'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _argon2_hasher(method):
+    if argon2 is None:
+        raise RuntimeError(f'Hash method {method!r} needs the argon2-cffi package')
+    params = method.split(':')[1:]
+    if len(params) != 3:
+        raise ValueError(f'Expected argon2:<time_cost>:<memory_kib>:<parallelism>, got {method!r}')
+    time_cost, memory_cost, parallelism = (int(p) for p in params)
+    return argon2.PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+
+@lru_cache(maxsize=None)
+def _werkzeug_prefix(method):
+    # werkzeug fills in default parameters ("scrypt" -> "scrypt:32768:8:1"); hash once to learn them
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def generate(secret, method):
+    """Hash ``secret`` with ``method`` on the calling thread. Needs no app context, so process pools can use it."""
+    if method.startswith('argon2'):
+        return _argon2_hasher(method).hash(secret)
+    return generate_password_hash(secret, method)
+
+
+def _verify(stored, secret):
+    if stored.startswith('$argon2'):
+        if argon2 is None:
+            raise RuntimeError('Stored hash is argon2 but argon2-cffi is not installed')
+        try:
+            return argon2.PasswordHasher().verify(stored, secret)
+        except argon2.exceptions.InvalidHashError:
+            return False
+        except argon2.exceptions.VerificationError:
+            return False
+    return check_password_hash(stored, secret)
+
+
+def _gevent_threading():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+def _run(func, *args):
+    workers = current_app.config['PASSWORD_HASH_WORKERS']
+    if workers <= 0:
+        return func(*args)
+
+    if _gevent_threading():
+        import gevent
+        pool = gevent.get_hub().threadpool
+        if pool.maxsize != workers:
+            pool.maxsize = workers
+        return pool.apply(func, args)
+
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hashing')
+    return _executor.submit(func, *args).result()
+
+
+def method_for(kind):
+    return current_app.config[_METHOD_CONFIG[kind]]
+
+
+def hash_secret(secret, kind='password'):
+    return _run(generate, str(secret), method_for(kind))
+
+
+def verify(stored, secret):
+    if not stored:
+        return False
+    return _run(_verify, stored, str(secret))
+
+
+def needs_rehash(stored, kind='password'):
+    """True if ``stored`` was made with a different algorithm or cost than the one configured for ``kind``"""
+    method = method_for(kind)
+    if method.startswith('argon2'):
+        return not stored.startswith('$argon2') or _argon2_hasher(method).check_needs_rehash(stored)
+    return stored.split('$', 1)[0] != _werkzeug_prefix(method)
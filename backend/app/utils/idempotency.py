@@ -0,0 +1,113 @@
+"""
+Idempotency-Key support for money-moving endpoints.
+
+The first request with a given key inserts a placeholder row in the same
+database transaction as the endpoint's own writes, so the key and the money
+movement commit (or roll back) together. The response is then stored on that
+row. Retries with the same key are answered from the stored response with a
+single indexed SELECT, before the endpoint takes any row locks.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _request_hash():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(b'\0')
+    digest.update(request.path.encode())
+    digest.update(b'\0')
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+    
+    if not record.is_complete:
+        return jsonify({'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed'}), 409
+    
+    response = make_response(jsonify(record.response_body), record.status_code)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Deduplicate retries of a view by the client's Idempotency-Key header (requires @jwt_required)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+        
+        user_id = int(get_jwt_identity())
+        request_hash = _request_hash()
+        now = datetime.utcnow()
+        
+        record = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+        
+        if record is not None and record.expires_at <= now:
+            db.session.delete(record)
+            db.session.flush()
+            record = None
+        
+        if record is not None:
+            return _replay(record, request_hash)
+        
+        record = IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            endpoint=request.endpoint,
+            request_hash=request_hash,
+            expires_at=now + current_app.config['IDEMPOTENCY_KEY_TTL']
+        )
+        db.session.add(record)
+        
+        try:
+            # Claims the key; a concurrent request with the same key blocks on the
+            # unique index until this transaction ends, then lands here
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            record = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+            if record is None:
+                return jsonify({'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed'}), 409
+            return _replay(record, request_hash)
+        
+        response = make_response(view(*args, **kwargs))
+        
+        if 200 <= response.status_code < 300:
+            record.status_code = response.status_code
+            record.response_body = response.get_json()
+            db.session.commit()
+        else:
+            # Failed requests are not cached, so the client may retry them with the same key
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(user_id=user_id, key=key, status_code=None).delete()
+            db.session.commit()
+        
+        return response
+    
+    return wrapper
+
+
+def purge_expired_keys():
+    """Delete idempotency records past their TTL. Returns the number of rows removed."""
+    count = IdempotencyKey.query.filter(IdempotencyKey.expires_at <= datetime.utcnow()).delete()
+    db.session.commit()
+    return count
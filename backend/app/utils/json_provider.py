@@ -0,0 +1,57 @@
+"""
+Flask JSON provider backed by orjson when it is installed.
+
+Responses built with ``jsonify`` are encoded in C. ``Decimal`` values become
+numbers, and ``date`` and ``datetime`` values become ISO 8601 strings. That
+lets serializers (``app.utils.serializers``) hand column values over as they
+are. Without orjson the standard library encoder is used, with the same type
+rules, so output does not depend on whether it is installed. Keys are sorted
+like Flask's default provider does. Debug apps get indented output.
+"""
+from datetime import date
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=_default, option=self._options(indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
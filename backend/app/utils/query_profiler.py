@@ -0,0 +1,87 @@
+"""
+Opt-in per-request SQL instrumentation.
+
+With ``SQL_PROFILING`` enabled, every statement executed while handling a
+request is counted and timed through the engine's cursor events. The totals
+are returned in a ``Server-Timing`` header. When one statement shape (the SQL
+text with parameters still bound as placeholders) runs more than
+``SQL_N_PLUS_ONE_THRESHOLD`` times in a request, a warning is logged. With
+``SQL_N_PLUS_ONE_STRICT`` the request fails with NPlusOneDetected instead,
+which test and benchmark runs use to turn N+1 regressions into errors.
+"""
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class NPlusOneDetected(RuntimeError):
+    pass
+
+
+def _stats():
+    if not has_request_context():
+        return None
+    return g.get('_sql_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is discarded with the statement even when it fails
+    if context is not None and _stats() is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _stats()
+    started = getattr(context, '_query_started', None)
+    if stats is None or started is None:
+        return
+    stats['time'] += time.perf_counter() - started
+    stats['count'] += 1
+    stats['shapes'][_WHITESPACE.sub(' ', statement).strip()] += 1
+
+
+def _start_request():
+    g._sql_stats = {'count': 0, 'time': 0.0, 'shapes': Counter(), 'started': time.perf_counter()}
+
+
+def _finish_request(response):
+    stats = g.pop('_sql_stats', None)
+    if stats is None:
+        return response
+
+    total_ms = (time.perf_counter() - stats['started']) * 1000
+    db_ms = stats['time'] * 1000
+    response.headers.add(
+        'Server-Timing',
+        f'db;desc="{stats["count"]} queries";dur={db_ms:.2f}, app;dur={total_ms:.2f}'
+    )
+
+    threshold = current_app.config['SQL_N_PLUS_ONE_THRESHOLD']
+    repeated = [(shape, count) for shape, count in stats['shapes'].most_common() if count > threshold]
+    if repeated:
+        shape, count = repeated[0]
+        message = (
+            f'Possible N+1 on {request.method} {request.path}: statement ran {count} times '
+            f'(threshold {threshold}): {shape[:300]}'
+        )
+        if current_app.config['SQL_N_PLUS_ONE_STRICT']:
+            raise NPlusOneDetected(message)
+        current_app.logger.warning(message)
+
+    return response
+
+
+def init_query_profiler(app, engine):
+    """Attach the cursor hooks to ``engine`` and the request hooks to ``app`` when SQL_PROFILING is on"""
+    if not app.config['SQL_PROFILING']:
+        return
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,158 @@
+"""
+Sliding-window rate limiting.
+
+``SlidingWindow`` uses the sliding-window-counter approximation. It keeps one
+counter per fixed window and weights the previous window by how much of it
+still overlaps the sliding one. So each key costs two integers, not a log of
+timestamps.
+
+Counters live in a backend. ``MemoryBackend`` is per process. ``RedisBackend``
+shares counts between workers and hosts and needs the ``redis`` package.
+``make_backend`` picks one from a URL (``memory://`` or ``redis://...``).
+"""
+import math
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # optional
+    redis = None
+
+
+class MemoryBackend:
+    # Expired keys are swept once the table grows past this many entries
+    SWEEP_THRESHOLD = 10000
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _sweep(self, now):
+        expired = [key for key, (_, _, expires_at) in self._counts.items() if expires_at <= now]
+        for key in expired:
+            del self._counts[key]
+
+    def incr(self, key, window_index, ttl):
+        now = time.time()
+        with self._lock:
+            index, count, _ = self._counts.get(key, (window_index, 0, 0))
+            if index == window_index:
+                self._counts[key] = (window_index, count + 1, now + ttl)
+            else:
+                # Keep the window that just ended as the "previous" count under a separate slot
+                self._counts[(key, 'previous')] = (index, count, now + ttl)
+                self._counts[key] = (window_index, 1, now + ttl)
+            if len(self._counts) > self.SWEEP_THRESHOLD:
+                self._sweep(now)
+
+    def counts(self, key, window_index):
+        with self._lock:
+            current = self._counts.get(key)
+            previous = self._counts.get((key, 'previous'))
+        found = {}
+        for entry in (previous, current):
+            if entry is not None:
+                found[entry[0]] = entry[1]
+        return found.get(window_index, 0), found.get(window_index - 1, 0)
+
+    def delete(self, key, window_index):
+        with self._lock:
+            self._counts.pop(key, None)
+            self._counts.pop((key, 'previous'), None)
+
+    def keys(self):
+        with self._lock:
+            return [key for key in self._counts if not isinstance(key, tuple)]
+
+
+class RedisBackend:
+    def __init__(self, url, prefix='unipay:ratelimit:'):
+        if redis is None:
+            raise RuntimeError('RATE_LIMIT_STORAGE_URL uses redis but the redis package is not installed')
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def _name(self, key, window_index):
+        return f'{self._prefix}{key}:{window_index}'
+
+    def incr(self, key, window_index, ttl):
+        name = self._name(key, window_index)
+        pipe = self._client.pipeline()
+        pipe.incr(name)
+        pipe.expire(name, int(math.ceil(ttl)))
+        pipe.execute()
+
+    def counts(self, key, window_index):
+        current, previous = self._client.mget(self._name(key, window_index), self._name(key, window_index - 1))
+        return int(current or 0), int(previous or 0)
+
+    def delete(self, key, window_index):
+        # Only the current and previous windows can still affect a decision
+        self._client.delete(self._name(key, window_index), self._name(key, window_index - 1))
+
+    def keys(self):
+        return None
+
+
+def make_backend(url):
+    if not url or url.startswith('memory://'):
+        return MemoryBackend()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f'Unsupported rate limit storage {url!r}')
+
+
+def parse_rate(rate):
+    """'5/300' -> (5, 300): at most 5 hits per 300 seconds"""
+    limit, _, window = str(rate).partition('/')
+    return int(limit), int(window or 60)
+
+
+class SlidingWindow:
+    def __init__(self, backend, name, limit, window):
+        self.backend = backend
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    def _position(self, now):
+        window_index, offset = divmod(now, self.window)
+        return int(window_index), offset / self.window
+
+    def retry_after(self, key, now=None):
+        """Seconds until ``key`` may try again, or 0 if it is under the limit. Does not count as a hit."""
+        now = time.time() if now is None else now
+        window_index, elapsed = self._position(now)
+        current, previous = self.backend.counts(self._key(key), window_index)
+        if previous * (1 - elapsed) + current < self.limit:
+            return 0
+
+        if current < self.limit:
+            # The previous window's weight decays until the estimate drops below the limit
+            fraction = 1 - (self.limit - current) / previous
+            return max(1, math.ceil((fraction - elapsed) * self.window))
+        # Blocked for the rest of this window, then until this window's own weight decays
+        fraction = 1 - self.limit / current
+        return max(1, math.ceil((1 - elapsed + fraction) * self.window))
+
+    def hit(self, key, now=None):
+        now = time.time() if now is None else now
+        window_index, _ = self._position(now)
+        self.backend.incr(self._key(key), window_index, self.window * 2)
+
+    def reset(self, key, now=None):
+        now = time.time() if now is None else now
+        window_index, _ = self._position(now)
+        self.backend.delete(self._key(key), window_index)
+
+    def locked_keys(self):
+        """Number of keys currently over the limit, or None if the backend cannot enumerate keys"""
+        keys = self.backend.keys()
+        if keys is None:
+            return None
+        prefix = f'{self.name}:'
+        return sum(1 for key in keys if key.startswith(prefix) and self.retry_after(key[len(prefix):]))
@@ -0,0 +1,88 @@
+"""
+Declarative column-to-field serializers for models.
+
+``Serializer(Model, fields, rename=...)`` names the attributes to expose once.
+On first use it builds an ``attrgetter`` for them, plus a converter for each
+``Numeric``, ``Date`` or ``DateTime`` column. Then:
+
+- ``serializer(obj)`` / ``serializer.many(objs)`` copy the raw values into a
+  dict. ``Decimal`` and datetimes are left for the JSON provider
+  (``app.utils.json_provider``) to encode, so list endpoints avoid a
+  ``float()`` and ``isoformat()`` call per field. Use these only for
+  responses built with ``jsonify``.
+- ``serializer.jsonable(obj)`` applies the converters and returns plain JSON
+  types, as ``to_dict`` always has. Use it for Socket.IO payloads, stored JSON
+  and anything else not encoded by Flask.
+"""
+from operator import attrgetter, itemgetter
+
+import sqlalchemy as sa
+
+
+def _to_float(value):
+    return float(value) if value is not None else None
+
+
+def _to_iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _converter(column_type):
+    if isinstance(column_type, sa.Numeric) and column_type.asdecimal:
+        return _to_float
+    if isinstance(column_type, (sa.Date, sa.DateTime)):
+        return _to_iso
+    return None
+
+
+class Serializer:
+    def __init__(self, model, fields, rename=None):
+        self.model = model
+        self.fields = tuple(fields)
+        self.keys = tuple((rename or {}).get(field, field) for field in self.fields)
+        self._getter = None
+        self._converters = None
+
+    def _build(self):
+        getter = attrgetter(*self.fields)
+        loaded = itemgetter(*self.fields)
+        if len(self.fields) == 1:
+            getter_one, loaded_one = getter, loaded
+            getter = lambda obj: (getter_one(obj),)
+            loaded = lambda state: (loaded_one(state),)
+
+        def values(obj):
+            # Loaded column values sit in the instance __dict__; reading them there skips the
+            # instrumented descriptors. Expired or deferred attributes fall back to a normal load.
+            try:
+                return loaded(obj.__dict__)
+            except KeyError:
+                return getter(obj)
+
+        self._getter = values
+        # Keyed by attribute name, which can differ from the column name
+        column_attrs = sa.inspect(self.model).column_attrs
+        self._converters = tuple(
+            (index, converter)
+            for index, field in enumerate(self.fields)
+            if field in column_attrs and (converter := _converter(column_attrs[field].columns[0].type)) is not None
+        )
+
+    def __call__(self, obj):
+        if self._getter is None:
+            self._build()
+        return dict(zip(self.keys, self._getter(obj)))
+
+    def many(self, objs):
+        if self._getter is None:
+            self._build()
+        keys, values = self.keys, self._getter
+        return [dict(zip(keys, values(obj))) for obj in objs]
+
+    def jsonable(self, obj):
+        if self._getter is None:
+            self._build()
+        values = list(self._getter(obj))
+        for index, converter in self._converters:
+            values[index] = converter(values[index])
+        return dict(zip(self.keys, values))
@@ -0,0 +1,24 @@
+from sqlalchemy import event
+
+
+def configure_sqlite(engine, busy_timeout_ms):
+    """
+    Put SQLite connections in WAL mode with a busy timeout.
+
+    WAL lets readers run while a write is in progress, and busy_timeout makes a
+    second writer wait for the lock instead of failing with "database is locked".
+    Does nothing for other databases; in-memory databases only get the timeout.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    in_memory = engine.url.database in (None, '', ':memory:')
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        cursor.close()
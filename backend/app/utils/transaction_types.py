@@ -0,0 +1,89 @@
+"""
+Transaction type registry.
+
+Single source of truth for whether a ``transaction_type`` moves money into
+(inflow) or out of (outflow) the owning user's account. The stats endpoint,
+the aggregate hooks and the maintenance scripts all classify through this
+module so their totals cannot drift apart.
+"""
+from sqlalchemy import and_, case
+
+INFLOW = 'inflow'
+OUTFLOW = 'outflow'
+
+TRANSACTION_TYPES = {
+    'topup': INFLOW,
+    'income': INFLOW,
+    'refund': INFLOW,
+    'transfer_received': INFLOW,
+    'loan_received': INFLOW,
+    'loan_repayment_received': INFLOW,
+    'loan_cancelled_refund': INFLOW,
+    'savings_withdrawal': INFLOW,
+    'sale': INFLOW,
+    'budget_withdrawal': INFLOW,
+
+    'payment': OUTFLOW,
+    'purchase': OUTFLOW,
+    'transfer_sent': OUTFLOW,
+    'card_payment': OUTFLOW,
+    'subscription_payment': OUTFLOW,
+    'loan_disbursement': OUTFLOW,
+    'loan_repayment': OUTFLOW,
+    'loan_cancelled_return': OUTFLOW,
+    'savings_deposit': OUTFLOW,
+    'budget_allocation': OUTFLOW,
+    'budget_expense': OUTFLOW,
+}
+
+# Legacy single-row transfers (e.g. generated history): the direction depends on
+# whether the owning user is the receiver or the sender of the row
+DIRECTIONAL_TYPES = ('transfer',)
+
+# Movements between the user's own sub-accounts that never touch the wallet
+# (budget card spending is already counted when funds were allocated)
+WALLET_NEUTRAL_TYPES = ('budget_expense',)
+
+INFLOW_TYPES = tuple(t for t, direction in TRANSACTION_TYPES.items() if direction == INFLOW)
+OUTFLOW_TYPES = tuple(t for t, direction in TRANSACTION_TYPES.items() if direction == OUTFLOW)
+
+
+def direction_of(transaction_type, user_id=None, sender_id=None, receiver_id=None):
+    """Return INFLOW, OUTFLOW or None (unclassified) for a single row"""
+    if transaction_type in DIRECTIONAL_TYPES:
+        if user_id is not None and receiver_id == user_id:
+            return INFLOW
+        if user_id is not None and sender_id == user_id:
+            return OUTFLOW
+        return None
+    return TRANSACTION_TYPES.get(transaction_type)
+
+
+def wallet_effect(transaction_type, user_id=None, sender_id=None, receiver_id=None):
+    """Return +1, -1 or 0: how a completed row of this type moves its owner's wallet balance"""
+    if transaction_type in WALLET_NEUTRAL_TYPES:
+        return 0
+    direction = direction_of(transaction_type, user_id, sender_id, receiver_id)
+    if direction == INFLOW:
+        return 1
+    if direction == OUTFLOW:
+        return -1
+    return 0
+
+
+def inflow_amount(transaction):
+    """SQL expression: the row's amount if it is an inflow for its owner, else 0"""
+    return case(
+        (transaction.transaction_type.in_(INFLOW_TYPES), transaction.amount),
+        (and_(transaction.transaction_type.in_(DIRECTIONAL_TYPES), transaction.receiver_id == transaction.user_id), transaction.amount),
+        else_=0
+    )
+
+
+def outflow_amount(transaction):
+    """SQL expression: the row's amount if it is an outflow for its owner, else 0"""
+    return case(
+        (transaction.transaction_type.in_(OUTFLOW_TYPES), transaction.amount),
+        (and_(transaction.transaction_type.in_(DIRECTIONAL_TYPES), transaction.sender_id == transaction.user_id), transaction.amount),
+        else_=0
+    )
@@ -0,0 +1,56 @@
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def increment_or_insert(connection, table, key, increments, extra_values=None, insert_values=None):
+    """
+    Atomically add ``increments`` to the row identified by ``key``, inserting it if missing.
+
+    ``key`` maps primary-key columns to values, ``increments`` maps numeric columns to
+    deltas, ``extra_values`` maps further columns to the SQL expression they are set to
+    on update, and ``insert_values`` gives those columns' values for a fresh row.
+    """
+    extra_values = extra_values or {}
+    set_values = {name: table.c[name] + delta for name, delta in increments.items()}
+    set_values.update(extra_values)
+
+    row = dict(key)
+    row.update(increments)
+    row.update(insert_values or {})
+
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        connection.execute(
+            dialect_insert(table).values(**row).on_conflict_do_update(
+                index_elements=[table.c[name] for name in key], set_=set_values
+            )
+        )
+        return
+
+    where = [table.c[name] == value for name, value in key.items()]
+    result = connection.execute(update(table).where(*where).values(**set_values))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**row))
+
+
+def insert_if_absent(connection, table, rows, key):
+    """Insert ``rows``, silently skipping any whose ``key`` columns match an existing row"""
+    if not rows:
+        return
+
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        connection.execute(
+            dialect_insert(table).on_conflict_do_nothing(index_elements=[table.c[name] for name in key]), rows
+        )
+        return
+
+    for row in rows:
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(table).values(**row))
+        except IntegrityError:
+            pass
@@ -0,0 +1,10 @@
+"""
+Benchmark suite for the UniPay API hot paths.
+
+Runs against an in-process app from ``create_app('testing')`` seeded with bulk
+fixtures, so results are reproducible without a running server:
+
+    cd backend
+    python -m benchmarks run --users 200 --transactions 50000 --output benchmarks/baseline.json
+    python -m benchmarks compare --baseline benchmarks/baseline.json --threshold 0.2
+"""
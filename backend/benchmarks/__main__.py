@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+import tempfile
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def _use_scratch_database():
+    # The suite drops and recreates every table, so it never touches the
+    # configured test database unless TEST_DATABASE_URL points there explicitly.
+    # Must run before config is first imported.
+    if 'TEST_DATABASE_URL' not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix='unipay-bench-'), 'bench.db')
+        os.environ['TEST_DATABASE_URL'] = f'sqlite:///{path}'
+
+
+def _build_app():
+    from app import create_app
+    return create_app('testing')
+
+
+def _run(args):
+    from benchmarks import runner
+    return runner.run(
+        _build_app(),
+        users=args.users,
+        transactions=args.transactions,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        seed_value=args.seed,
+        only=args.scenario
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='UniPay API benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Seed, benchmark every scenario and write a results file')
+    compare_parser = commands.add_parser('compare', help='Re-run with the baseline settings and flag regressions')
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--users', type=int)
+        sub.add_argument('--transactions', type=int)
+        sub.add_argument('--iterations', type=int)
+        sub.add_argument('--warmup', type=int)
+        sub.add_argument('--seed', type=int)
+        sub.add_argument('--scenario', action='append', help='Only run this scenario (repeatable)')
+
+    run_parser.add_argument('--output', default=DEFAULT_BASELINE, help='Where to write the results JSON')
+
+    serialize_parser = commands.add_parser('serialize', help='Time JSON encoding of large list responses, without the database')
+    serialize_parser.add_argument('--rows', type=int, default=100)
+    serialize_parser.add_argument('--iterations', type=int, default=200)
+
+    compare_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    compare_parser.add_argument('--metric', default='p95_ms', choices=['mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'])
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown as a fraction (0.2 = 20%%)')
+    compare_parser.add_argument('--output', help='Also write the current results here')
+
+    args = parser.parse_args()
+
+    _use_scratch_database()
+    if args.command == 'serialize':
+        from benchmarks import serialization
+        serialization.run(_build_app(), rows=args.rows, iterations=args.iterations)
+        return 0
+
+    from benchmarks import runner
+
+    defaults = {'users': 200, 'transactions': 50000, 'iterations': 200, 'warmup': 10, 'seed': 42}
+    if args.command == 'compare':
+        baseline = runner.load(args.baseline)
+        defaults.update({key: baseline['meta'][key] for key in defaults if key in baseline['meta']})
+    for key, value in defaults.items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+
+    result = _run(args)
+
+    if args.command == 'run':
+        runner.save(result, args.output)
+        print(f'Wrote {args.output}')
+        return 0
+
+    if args.output:
+        runner.save(result, args.output)
+
+    rows, regressions = runner.compare(baseline, result, args.metric, args.threshold)
+    print(f'\n{args.metric} vs {args.baseline} (threshold {args.threshold:.0%})')
+    for row in rows:
+        flag = 'REGRESSION' if row['regressed'] else ''
+        print(f"  {row['scenario']:<28} {row['baseline']:>9.2f} -> {row['current']:>9.2f}  {row['change']:>+7.1%}  {flag}")
+
+    if regressions:
+        print(f'\n{len(regressions)} scenario(s) regressed: {", ".join(regressions)}')
+        return 1
+    print('\nNo regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Bulk fixtures: seed N users and M transactions with multi-row inserts instead of per-row ORM adds."""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.models import User, Wallet, Transaction, VirtualCard, Loan, MarketplaceListing
+from app.services import transaction_aggregates
+from app.utils.transaction_types import TRANSACTION_TYPES
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+BENCHMARK_PIN = '1234'
+
+CHUNK_SIZE = 5000
+
+
+def benchmark_email(index):
+    return f'bench{index}@benchmark.local'
+
+
+def _insert_chunked(model, rows, returning=None):
+    ids = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        if returning is not None:
+            ids.extend(db.session.scalars(insert(model).returning(returning, sort_by_parameter_order=True), chunk).all())
+        else:
+            db.session.execute(insert(model), chunk)
+    return ids
+
+
+def seed(users, transactions, seed=42):
+    """Recreate the schema and seed it. Returns the seeded user ids in creation order."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    db.drop_all()
+    db.create_all()
+
+    # Hash once: every benchmark user shares the same credentials
+    password_hash = generate_password_hash(BENCHMARK_PASSWORD)
+    pin_hash = generate_password_hash(BENCHMARK_PIN)
+
+    user_ids = _insert_chunked(User, [
+        {
+            'email': benchmark_email(i),
+            'username': f'bench{i}',
+            'password_hash': password_hash,
+            'pin_hash': pin_hash,
+            'pin_is_default': True,
+            'first_name': 'Bench',
+            'last_name': f'User{i}',
+            'created_at': now,
+        }
+        for i in range(users)
+    ], returning=User.id)
+
+    _insert_chunked(Wallet, [
+        {'user_id': user_id, 'balance': Decimal('1000.00'), 'currency': 'USD'}
+        for user_id in user_ids
+    ])
+
+    types = list(TRANSACTION_TYPES)
+    rows = []
+    for _ in range(transactions):
+        user_id = rng.choice(user_ids)
+        counterparty = rng.choice(user_ids)
+        transaction_type = rng.choice(types)
+        created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        rows.append({
+            'user_id': user_id,
+            'transaction_type': transaction_type,
+            'amount': Decimal(rng.randint(100, 20000)) / 100,
+            'currency': 'USD',
+            'status': 'completed',
+            'sender_id': user_id if transaction_type == 'transfer_sent' else counterparty,
+            'receiver_id': user_id if transaction_type == 'transfer_received' else counterparty,
+            'description': f'Benchmark {transaction_type}',
+            'created_at': created_at,
+            'completed_at': created_at,
+        })
+    _insert_chunked(Transaction, rows)
+
+    cards = []
+    for user_id in user_ids:
+        cards.append({'user_id': user_id, 'card_name': 'Payment Card', 'card_purpose': 'payment', 'card_type': 'standard'})
+        cards.append({
+            'user_id': user_id,
+            'card_name': 'Food Budget',
+            'card_purpose': 'budget',
+            'card_type': 'standard',
+            'category': 'food',
+            'allocated_amount': Decimal('200.00'),
+            'spent_amount': Decimal('50.00'),
+        })
+    _insert_chunked(VirtualCard, cards)
+
+    # Every user lends to the next one, so each has one loan on each side
+    _insert_chunked(Loan, [
+        {
+            'lender_id': lender_id,
+            'borrower_id': user_ids[(index + 1) % len(user_ids)],
+            'amount': Decimal('50.00'),
+            'amount_repaid': Decimal('10.00'),
+            'status': 'active',
+            'description': 'Benchmark loan',
+            'created_at': now,
+        }
+        for index, lender_id in enumerate(user_ids)
+    ])
+
+    _insert_chunked(MarketplaceListing, [
+        {
+            'seller_id': user_id,
+            'title': f'Textbook {index}',
+            'description': 'Benchmark listing',
+            'category': 'books',
+            'price': Decimal('15.00'),
+            'is_available': True,
+            'is_sold': False,
+            'created_at': now,
+        }
+        for index, user_id in enumerate(user_ids)
+    ])
+
+    transaction_aggregates.rebuild()
+    db.session.commit()
+    return user_ids
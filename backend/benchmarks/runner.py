@@ -0,0 +1,146 @@
+"""Scenario timing, baseline files and regression comparison."""
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+
+import sqlalchemy
+
+from app.extensions import db
+from app.models import User
+from app.utils.auth_claims import access_token_for
+from benchmarks.fixtures import BENCHMARK_PASSWORD, benchmark_email, seed
+
+# Users whose tokens the scenarios rotate through, so no single row stays hot in every cache
+ROTATION = 10
+
+
+def _login(client, user, headers):
+    return client.post('/api/auth/login', json={'email': benchmark_email(user['index']), 'password': BENCHMARK_PASSWORD})
+
+
+def _get(path):
+    def scenario(client, user, headers):
+        return client.get(path, headers=headers)
+    return scenario
+
+
+SCENARIOS = {
+    'auth.login': _login,
+    'wallet.get': _get('/api/wallet'),
+    'transactions.page_1': _get('/api/transactions?page=1&per_page=20'),
+    'transactions.page_10': _get('/api/transactions?page=10&per_page=20'),
+    'transactions.cursor_first': _get('/api/transactions?cursor=&per_page=20'),
+    'transactions.cursor_100': _get('/api/transactions?cursor=&per_page=100'),
+    'transactions.stats': _get('/api/transactions/stats'),
+    'cards.list': _get('/api/cards'),
+    'loans.list': _get('/api/loans'),
+    'marketplace.listings': _get('/api/marketplace/listings'),
+}
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def _measure(client, scenario, users, iterations, warmup):
+    for i in range(warmup):
+        user = users[i % len(users)]
+        scenario(client, user, user['headers'])
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        user = users[i % len(users)]
+        request_started = time.perf_counter()
+        response = scenario(client, user, user['headers'])
+        latencies.append((time.perf_counter() - request_started) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'p50_ms': round(_percentile(latencies, 0.50), 3),
+        'p95_ms': round(_percentile(latencies, 0.95), 3),
+        'p99_ms': round(_percentile(latencies, 0.99), 3),
+        'throughput_rps': round(iterations / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def run(app, users, transactions, iterations, warmup=10, seed_value=42, only=None, log=print):
+    """Seed the testing database and time every scenario. Returns a JSON-serialisable result."""
+    with app.app_context():
+        log(f'Seeding {users} users and {transactions} transactions...')
+        user_ids = seed(users, transactions, seed_value)
+        rotation = [
+            {
+                'index': index,
+                'id': user_id,
+                'headers': {'Authorization': f'Bearer {access_token_for(db.session.get(User, user_id))}'},
+            }
+            for index, user_id in enumerate(user_ids[:ROTATION])
+        ]
+        dialect = db.engine.dialect.name
+
+    client = app.test_client()
+    scenarios = {}
+    for name, scenario in SCENARIOS.items():
+        if only and name not in only:
+            continue
+        scenarios[name] = _measure(client, scenario, rotation, iterations, warmup)
+        result = scenarios[name]
+        log(f"  {name:<28} p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+            f"p99 {result['p99_ms']:>8.2f} ms  {result['throughput_rps']:>8.1f} req/s"
+            + (f"  ({result['errors']} errors)" if result['errors'] else ''))
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'users': users,
+            'transactions': transactions,
+            'iterations': iterations,
+            'warmup': warmup,
+            'seed': seed_value,
+            'database': dialect,
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'machine': platform.machine(),
+        },
+        'scenarios': scenarios,
+    }
+
+
+def save(result, path):
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, metric='p95_ms', threshold=0.2):
+    """Return (rows, regressions): a row per scenario in both runs, and the names that got slower than allowed"""
+    rows = []
+    regressions = []
+    for name, base in baseline['scenarios'].items():
+        if name not in current['scenarios']:
+            continue
+        before = base[metric]
+        after = current['scenarios'][name][metric]
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold
+        rows.append({'scenario': name, 'baseline': before, 'current': after, 'change': change, 'regressed': regressed})
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
@@ -0,0 +1,71 @@
+"""Encoding cost of large list responses: per-row to_dict + stdlib JSON vs serializers + the fast JSON provider."""
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+from app.models import Merchant, Transaction
+from app.models.merchant import merchant_serializer
+from app.models.transaction import transaction_serializer
+from app.utils.json_provider import FastJSONProvider, orjson
+
+
+def _transactions(count):
+    started = datetime(2025, 1, 1)
+    return [
+        Transaction(
+            id=index, user_id=1, transaction_type='transfer_sent', amount=Decimal('12.34') + index,
+            currency='USD', status='completed', sender_id=1, receiver_id=2, description=f'Transfer {index}',
+            transaction_metadata={'note': 'benchmark', 'index': index},
+            created_at=started + timedelta(minutes=index), completed_at=started + timedelta(minutes=index, seconds=1)
+        )
+        for index in range(count)
+    ]
+
+
+def _merchants(count):
+    return [
+        Merchant(
+            id=index, name=f'Merchant {index}', category='food', logo_url=None, discount_percentage=10.0,
+            discount_description='10% off', online_domain=f'merchant{index}.example', online_url_patterns=[f'merchant{index}.example/*'],
+            pos_merchant_id=f'POS{index:05d}', nfc_enabled=True, auto_apply_online=False, requires_verification=True,
+            is_active=True, created_at=datetime(2025, 1, 1)
+        )
+        for index in range(count)
+    ]
+
+
+def _time(func, iterations):
+    func()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(app, rows=100, iterations=200, log=print):
+    """Time encoding ``rows`` transactions and merchants both ways. Returns {payload: {variant: ms}}."""
+    results = {}
+    with app.test_request_context():
+        standard = DefaultJSONProvider(app)
+        fast = FastJSONProvider(app)
+        payloads = {
+            'transactions': (_transactions(rows), transaction_serializer),
+            'merchants': (_merchants(rows), merchant_serializer),
+        }
+        log(f'Encoding {rows} rows, median of {iterations} runs (orjson {"installed" if orjson else "not installed"})')
+        for name, (objs, serializer) in payloads.items():
+            timings = {
+                'to_dict + stdlib json': _time(lambda: standard.response({name: [obj.to_dict() for obj in objs]}), iterations),
+                'to_dict + fast provider': _time(lambda: fast.response({name: [obj.to_dict() for obj in objs]}), iterations),
+                'serializer + fast provider': _time(lambda: fast.response({name: serializer.many(objs)}), iterations),
+            }
+            baseline = timings['to_dict + stdlib json']
+            for variant, ms in timings.items():
+                log(f'  {name:<14} {variant:<28} {ms:>8.3f} ms  {baseline / ms:>5.1f}x')
+            results[name] = timings
+    return results
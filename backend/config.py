@@ -1,23 +1,89 @@
 import os
 from datetime import timedelta
 
+def engine_options(database_uri):
+    """SQLAlchemy engine options; pool sizing only applies to server databases, not SQLite"""
+    options = {
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+    }
+    if not database_uri.startswith('sqlite'):
+        options.update(
+            pool_size=int(os.environ.get('DB_POOL_SIZE') or 10),
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW') or 20),
+            pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT') or 10),
+        )
+    return options
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///unipay.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-    }
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Applied to SQLite connections only, together with WAL mode for file databases
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000)
     
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # Revoked-token (logout) checks: how often each worker picks up revocations made elsewhere, and rebuilds its filter
+    TOKEN_REVOCATION_SYNC_SECONDS = int(os.environ.get('TOKEN_REVOCATION_SYNC_SECONDS') or 5)
+    TOKEN_REVOCATION_REBUILD_SECONDS = int(os.environ.get('TOKEN_REVOCATION_REBUILD_SECONDS') or 600)
+    TOKEN_REVOCATION_BLOOM_CAPACITY = int(os.environ.get('TOKEN_REVOCATION_BLOOM_CAPACITY') or 100000)
+    
+    DB_CONFLICT_RETRY_ATTEMPTS = int(os.environ.get('DB_CONFLICT_RETRY_ATTEMPTS') or 3)
+    
+    IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS') or 24))
+    
+    MAX_BATCH_TRANSFERS = int(os.environ.get('MAX_BATCH_TRANSFERS') or 50)
+    
+    # Issuer prefix for payment card numbers, and how many numbers each worker reserves per database check
+    CARD_BIN = os.environ.get('CARD_BIN') or '400000'
+    CARD_NUMBER_BLOCK_SIZE = int(os.environ.get('CARD_NUMBER_BLOCK_SIZE') or 64)
+    
+    # werkzeug method strings (scrypt:N:r:p, pbkdf2:sha256:iterations) or argon2:time_cost:memory_kib:parallelism.
+    # Stored hashes made with other parameters are upgraded on the next successful login or PIN check.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PIN_HASH_METHOD = os.environ.get('PIN_HASH_METHOD') or 'scrypt:32768:8:1'
+    # OS threads hashing concurrently per worker process; 0 hashes on the request thread
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1)
+    
+    # Per-process cache of user summaries (username, is_active, PIN flags); USER_CACHE_TTL=0 disables it
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 4096)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 30)
+    
+    # How often each worker checks the merchant catalog version before serving its cached copy
+    MERCHANT_CATALOG_CHECK_SECONDS = int(os.environ.get('MERCHANT_CATALOG_CHECK_SECONDS') or 5)
+    
+    # Failed login / PIN attempts allowed per sliding window, as "<attempts>/<seconds>"
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+    RATE_LIMIT_STORAGE_URL = os.environ.get('RATE_LIMIT_STORAGE_URL') or 'memory://'
+    LOGIN_RATE_LIMIT_ACCOUNT = os.environ.get('LOGIN_RATE_LIMIT_ACCOUNT') or '5/300'
+    LOGIN_RATE_LIMIT_IP = os.environ.get('LOGIN_RATE_LIMIT_IP') or '50/300'
+    PIN_RATE_LIMIT_USER = os.environ.get('PIN_RATE_LIMIT_USER') or '5/300'
+    PIN_RATE_LIMIT_IP = os.environ.get('PIN_RATE_LIMIT_IP') or '50/300'
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted for the client IP
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT') or 0)
+    
+    # Processes used to hash passwords and PINs during `flask import-users`
+    ONBOARDING_HASH_WORKERS = int(os.environ.get('ONBOARDING_HASH_WORKERS') or os.cpu_count() or 1)
+    
+    # Per-request query counts in Server-Timing headers, plus N+1 detection
+    SQL_PROFILING = os.environ.get('SQL_PROFILING', 'false').lower() in ['true', 'on', '1']
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD') or 5)
+    SQL_N_PLUS_ONE_STRICT = os.environ.get('SQL_N_PLUS_ONE_STRICT', 'false').lower() in ['true', 'on', '1']
+    
+    # Prometheus scrape endpoint at /metrics; scrapers send METRICS_TOKEN as a Bearer token (required outside debug/testing)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
     CORS_ORIGINS = ['http://localhost:5000', 'http://0.0.0.0:5000', 'http://localhost:5001', 'http://0.0.0.0:5001']
     
     SOCKETIO_CORS_ALLOWED_ORIGINS = '*'
+    # e.g. redis://localhost:6379/0 so every worker process can reach every client
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
     
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
@@ -38,7 +104,8 @@ class ProductionConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///test.db'
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,41 @@
+"""
+Gunicorn settings for the UniPay API (``gunicorn -c gunicorn.conf.py wsgi:app``).
+
+Flask-SocketIO needs an async worker: the gevent WebSocket worker serves plain
+HTTP and Socket.IO from the same process, one greenlet per connection. Socket.IO
+long-polling clients must keep hitting the same worker, so more than one worker
+needs SOCKETIO_MESSAGE_QUEUE and sticky sessions in front; without a message
+queue we default to a single worker.
+
+Every setting can be overridden from the environment.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'geventwebsocket.gunicorn.workers.GeventWebSocketWorker')
+workers = int(os.environ.get('GUNICORN_WORKERS') or (
+    multiprocessing.cpu_count() * 2 + 1 if os.environ.get('SOCKETIO_MESSAGE_QUEUE') else 1
+))
+# Concurrent greenlets per worker; keep DB_POOL_SIZE + DB_MAX_OVERFLOW in mind,
+# requests beyond the pool wait up to DB_POOL_TIMEOUT seconds for a connection
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS') or 1000)
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT') or 30)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE') or 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # psycopg2 blocks the whole gevent hub on queries unless its wait callback is patched
+    if 'gevent' in worker_class.lower():
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            return
+        patch_psycopg()
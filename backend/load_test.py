@@ -0,0 +1,135 @@
+"""
+Minimal HTTP load generator for the UniPay API (stdlib only).
+
+Logs in (or registers) a load-test user, then hammers one endpoint from N
+keep-alive connections for a fixed duration and prints requests/s and
+latency percentiles. Used for the numbers in docs/architecture/deployment.md.
+
+Usage:
+    python load_test.py --url http://localhost:8000 --path /api/wallet --concurrency 32 --duration 20
+    python load_test.py --path /api/wallet/topup --method POST --body '{"amount": 1}'
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def _connection(base):
+    parts = urlsplit(base)
+    cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    return cls(parts.hostname, parts.port, timeout=30)
+
+
+def _request(conn, method, path, body=None, headers=None):
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def get_token(base, username, password):
+    conn = _connection(base)
+    headers = {'Content-Type': 'application/json'}
+    email = f'{username}@loadtest.local'
+    credentials = json.dumps({'email': email, 'password': password})
+    status, payload = _request(conn, 'POST', '/api/auth/login', credentials, headers)
+    if status != 200:
+        registration = json.dumps({
+            'username': username,
+            'email': email,
+            'password': password,
+            'pin': '1234',
+            'first_name': 'Load',
+            'last_name': 'Test'
+        })
+        _request(conn, 'POST', '/api/auth/register', registration, headers)
+        status, payload = _request(conn, 'POST', '/api/auth/login', credentials, headers)
+    conn.close()
+    if status != 200:
+        raise SystemExit(f'Could not log in as {username}: {status} {payload[:200]!r}')
+    return json.loads(payload)['access_token']
+
+
+def run(base, method, path, body, headers, concurrency, duration):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        conn = _connection(base)
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status, _ = _request(conn, method, path, body, headers)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = _connection(base)
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                local_errors += 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--path', default='/api/wallet')
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--body', help='JSON request body')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--username', default='loadtest')
+    parser.add_argument('--password', default='loadtest-password')
+    parser.add_argument('--anonymous', action='store_true', help='Do not authenticate')
+    args = parser.parse_args()
+
+    headers = {'Content-Type': 'application/json'}
+    if not args.anonymous:
+        headers['Authorization'] = f'Bearer {get_token(args.url, args.username, args.password)}'
+
+    result = run(args.url, args.method.upper(), args.path, args.body, headers, args.concurrency, args.duration)
+    print(f"{args.method.upper()} {args.path}  concurrency={args.concurrency}  duration={args.duration:g}s")
+    print(f"  requests: {result['requests']}  errors: {result['errors']}")
+    print(f"  throughput: {result['requests_per_second']:.1f} req/s")
+    print(f"  latency: mean {result['mean_ms']:.1f} ms  p50 {result['p50_ms']:.1f} ms  "
+          f"p95 {result['p95_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Rebuild transaction_aggregates with the shared transaction type registry
+
+Revision ID: 0c5e8a3d71f2
+Revises: f41b9d27c6a8
+Create Date: 2025-11-10 15:03:27.118604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c5e8a3d71f2'
+down_revision = 'f41b9d27c6a8'
+branch_labels = None
+depends_on = None
+
+# Mirrors app.utils.transaction_types at this revision
+INFLOW_TYPES = (
+    'topup', 'income', 'refund', 'transfer_received', 'loan_received',
+    'loan_repayment_received', 'loan_cancelled_refund', 'savings_withdrawal',
+    'sale', 'budget_withdrawal'
+)
+OUTFLOW_TYPES = (
+    'payment', 'purchase', 'transfer_sent', 'card_payment', 'subscription_payment',
+    'loan_disbursement', 'loan_repayment', 'loan_cancelled_return',
+    'savings_deposit', 'budget_allocation', 'budget_expense'
+)
+
+
+def _in_list(types):
+    return ', '.join(f"'{t}'" for t in types)
+
+
+def upgrade():
+    op.execute('DELETE FROM transaction_aggregates')
+    op.execute(f"""
+        INSERT INTO transaction_aggregates
+            (user_id, total_income, total_expenses, transaction_count, last_transaction_at, updated_at)
+        SELECT
+            user_id,
+            COALESCE(SUM(CASE
+                WHEN transaction_type IN ({_in_list(INFLOW_TYPES)}) THEN amount
+                WHEN transaction_type = 'transfer' AND receiver_id = user_id THEN amount
+                ELSE 0 END), 0),
+            COALESCE(SUM(CASE
+                WHEN transaction_type IN ({_in_list(OUTFLOW_TYPES)}) THEN amount
+                WHEN transaction_type = 'transfer' AND sender_id = user_id THEN amount
+                ELSE 0 END), 0),
+            COUNT(id),
+            MAX(created_at),
+            CURRENT_TIMESTAMP
+        FROM transactions
+        GROUP BY user_id
+    """)
+
+
+def downgrade():
+    # Aggregates computed with the wider registry remain valid running totals;
+    # run `flask rebuild-aggregates` on the older code if exact parity is needed
+    pass
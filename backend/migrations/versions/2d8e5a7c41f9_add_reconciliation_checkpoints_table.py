@@ -0,0 +1,32 @@
+"""Add reconciliation_checkpoints table
+
+Revision ID: 2d8e5a7c41f9
+Revises: 9b3f6c2e84a1
+Create Date: 2025-11-12 15:02:38.541720
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8e5a7c41f9'
+down_revision = '9b3f6c2e84a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reconciliation_checkpoints',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('transaction_net', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('last_transaction_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('reconciliation_checkpoints')
@@ -0,0 +1,30 @@
+"""Add catalog_versions table
+
+Revision ID: 6e2b4c9d07a1
+Revises: a3d9e6f15c82
+Create Date: 2025-11-15 11:03:48.205917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e2b4c9d07a1'
+down_revision = 'a3d9e6f15c82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_versions = op.create_table('catalog_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(catalog_versions, [{'name': 'merchants', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('catalog_versions')
@@ -0,0 +1,132 @@
+"""Add double-entry ledger, balance projection and balance snapshots
+
+Revision ID: 9b3f6c2e84a1
+Revises: 7a2d4e9b10c3
+Create Date: 2025-11-12 09:14:27.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3f6c2e84a1'
+down_revision = '7a2d4e9b10c3'
+branch_labels = None
+depends_on = None
+
+# (account_type, source table, balance expression, owner column, filter)
+OPENING_BALANCES = (
+    ('wallet', 'wallets', 'balance', 'user_id', '1 = 1'),
+    ('savings_pocket', 'savings_pockets', 'balance', 'user_id', '1 = 1'),
+    ('budget_card', 'virtual_cards', "COALESCE(allocated_amount, 0) - COALESCE(spent_amount, 0)", 'user_id', "card_purpose = 'budget'"),
+)
+
+
+def upgrade():
+    op.create_table('ledger_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('journal_id', sa.String(length=36), nullable=False),
+    sa.Column('account_type', sa.String(length=20), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('direction', sa.String(length=6), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('entry_type', sa.String(length=50), nullable=False),
+    sa.Column('transaction_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.CheckConstraint('amount > 0', name='ck_ledger_entries_amount_positive'),
+    sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ledger_entries', schema=None) as batch_op:
+        batch_op.create_index('ix_ledger_entries_account_id', ['account_type', 'account_id', 'id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_ledger_entries_journal_id'), ['journal_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_ledger_entries_user_id'), ['user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_ledger_entries_created_at'), ['created_at'], unique=False)
+
+    op.create_table('account_balances',
+    sa.Column('account_type', sa.String(length=20), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('balance', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.Column('last_entry_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('account_type', 'account_id')
+    )
+    with op.batch_alter_table('account_balances', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_account_balances_user_id'), ['user_id'], unique=False)
+
+    op.create_table('account_balance_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('account_type', sa.String(length=20), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('last_entry_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('account_balance_snapshots', schema=None) as batch_op:
+        batch_op.create_index('ix_account_balance_snapshots_account_taken', ['account_type', 'account_id', 'taken_at'], unique=False)
+
+    # Open every existing account with one balanced journal against the external
+    # account, so the projection starts equal to the balances held today
+    for account_type, table, balance, owner, condition in OPENING_BALANCES:
+        for side, account, owner_expr, direction in (
+            ('source', "'external'", 'NULL', f"CASE WHEN {balance} > 0 THEN 'debit' ELSE 'credit' END"),
+            ('destination', f"'{account_type}'", owner, f"CASE WHEN {balance} > 0 THEN 'credit' ELSE 'debit' END"),
+        ):
+            op.execute(f"""
+                INSERT INTO ledger_entries
+                    (journal_id, account_type, account_id, user_id, direction, amount, currency, entry_type, created_at)
+                SELECT
+                    'opening:{account_type}:' || CAST(id AS VARCHAR(12)),
+                    {account},
+                    {'0' if side == 'source' else 'id'},
+                    {owner_expr},
+                    {direction},
+                    ABS({balance}),
+                    'USD',
+                    'opening_balance',
+                    CURRENT_TIMESTAMP
+                FROM {table}
+                WHERE {condition} AND {balance} <> 0
+            """)
+
+    op.execute("""
+        INSERT INTO account_balances
+            (account_type, account_id, user_id, balance, entry_count, last_entry_id, updated_at)
+        SELECT
+            account_type,
+            account_id,
+            MAX(user_id),
+            SUM(CASE WHEN direction = 'credit' THEN amount ELSE -amount END),
+            COUNT(id),
+            MAX(id),
+            CURRENT_TIMESTAMP
+        FROM ledger_entries
+        WHERE account_type <> 'external'
+        GROUP BY account_type, account_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('account_balance_snapshots', schema=None) as batch_op:
+        batch_op.drop_index('ix_account_balance_snapshots_account_taken')
+
+    op.drop_table('account_balance_snapshots')
+    with op.batch_alter_table('account_balances', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_account_balances_user_id'))
+
+    op.drop_table('account_balances')
+    with op.batch_alter_table('ledger_entries', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ledger_entries_created_at'))
+        batch_op.drop_index(batch_op.f('ix_ledger_entries_user_id'))
+        batch_op.drop_index(batch_op.f('ix_ledger_entries_journal_id'))
+        batch_op.drop_index('ix_ledger_entries_account_id')
+
+    op.drop_table('ledger_entries')
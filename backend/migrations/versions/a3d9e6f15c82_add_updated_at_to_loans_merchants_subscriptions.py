@@ -0,0 +1,32 @@
+"""Add updated_at to loans, merchants and subscriptions
+
+Revision ID: a3d9e6f15c82
+Revises: 5f0c3b8e92d7
+Create Date: 2025-11-14 15:27:04.731592
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d9e6f15c82'
+down_revision = '5f0c3b8e92d7'
+branch_labels = None
+depends_on = None
+
+TABLES = ('loans', 'merchants', 'subscriptions')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # Existing rows start from their creation time; ETags only need it to move forward from here
+        op.execute(sa.text(f'UPDATE {table} SET updated_at = created_at'))
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,50 @@
+"""Add iban to virtual_cards
+
+Revision ID: c4f1a9e27b53
+Revises: 2d8e5a7c41f9
+Create Date: 2025-11-13 10:21:47.183205
+
+"""
+import random
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f1a9e27b53'
+down_revision = '2d8e5a7c41f9'
+branch_labels = None
+depends_on = None
+
+
+def _legacy_iban(card_id):
+    # What VirtualCard.get_iban showed before IBANs were stored: random.seed(card_id) and 12 random digits
+    rng = random.Random(card_id)
+    check = ''.join(str(rng.randint(0, 9)) for _ in range(2))
+    account = ''.join(str(rng.randint(0, 9)) for _ in range(10))
+    return 'GB' + check + 'UNIP' + account
+
+
+def upgrade():
+    with op.batch_alter_table('virtual_cards', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('iban', sa.String(length=34), nullable=True))
+
+    # Store the IBAN existing cards have always shown, so it does not change and never depends on SECRET_KEY
+    connection = op.get_bind()
+    virtual_cards = sa.table('virtual_cards', sa.column('id', sa.Integer), sa.column('iban', sa.String))
+    card_ids = connection.execute(sa.select(virtual_cards.c.id)).scalars().all()
+    if card_ids:
+        connection.execute(
+            virtual_cards.update().where(virtual_cards.c.id == sa.bindparam('card_id')),
+            [{'card_id': card_id, 'iban': _legacy_iban(card_id)} for card_id in card_ids]
+        )
+
+    with op.batch_alter_table('virtual_cards', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_virtual_cards_iban'), ['iban'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('virtual_cards', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_virtual_cards_iban'))
+        batch_op.drop_column('iban')
@@ -0,0 +1,26 @@
+"""Add composite (user_id, created_at, id) index to transactions
+
+Revision ID: e3a7c1f0b2d4
+Revises: d16c8d920bc4
+Create Date: 2025-11-10 09:12:04.318520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a7c1f0b2d4'
+down_revision = 'd16c8d920bc4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_user_created_id', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_user_created_id')
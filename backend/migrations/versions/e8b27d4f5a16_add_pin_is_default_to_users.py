@@ -0,0 +1,27 @@
+"""Add pin_is_default to users
+
+Revision ID: e8b27d4f5a16
+Revises: c4f1a9e27b53
+Create Date: 2025-11-13 16:40:12.905318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b27d4f5a16'
+down_revision = 'c4f1a9e27b53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Left NULL for existing users: User.has_default_pin() checks the hash once and stores the answer
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pin_is_default', sa.Boolean(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('pin_is_default')
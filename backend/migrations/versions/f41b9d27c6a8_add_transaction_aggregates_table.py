@@ -0,0 +1,57 @@
+"""Add transaction_aggregates table and backfill it from transactions
+
+Revision ID: f41b9d27c6a8
+Revises: e3a7c1f0b2d4
+Create Date: 2025-11-10 11:40:52.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41b9d27c6a8'
+down_revision = 'e3a7c1f0b2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('transaction_aggregates',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_income', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('total_expenses', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('last_transaction_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill so the incremental hooks start from correct totals; the type
+    # lists mirror app.services.transaction_aggregates at this revision
+    op.execute("""
+        INSERT INTO transaction_aggregates
+            (user_id, total_income, total_expenses, transaction_count, last_transaction_at, updated_at)
+        SELECT
+            user_id,
+            COALESCE(SUM(CASE WHEN transaction_type IN (
+                'topup', 'income', 'refund', 'transfer_received',
+                'loan_repayment_received', 'loan_received', 'savings_withdrawal',
+                'sale', 'budget_withdrawal'
+            ) THEN amount ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN transaction_type IN (
+                'payment', 'purchase', 'transfer_sent', 'card_payment',
+                'loan_disbursement', 'loan_repayment', 'savings_deposit',
+                'budget_allocation', 'budget_expense'
+            ) THEN amount ELSE 0 END), 0),
+            COUNT(id),
+            MAX(created_at),
+            CURRENT_TIMESTAMP
+        FROM transactions
+        GROUP BY user_id
+    """)
+
+
+def downgrade():
+    op.drop_table('transaction_aggregates')
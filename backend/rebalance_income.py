@@ -15,6 +15,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from app import create_app
 from app.extensions import db
 from app.models import Transaction, User, Wallet
+from app.utils.transaction_types import inflow_amount, outflow_amount
+from sqlalchemy import func
 
 # Income transaction descriptions with amounts
 INCOME_SOURCES = [
@@ -97,28 +99,13 @@ def main():
         
         for user in users:
             # Calculate current totals
-            income_txns = db.session.execute(db.text("""
-                SELECT COALESCE(SUM(amount), 0) as total
-                FROM transactions
-                WHERE user_id = :user_id
-                AND (
-                    transaction_type IN ('topup', 'income', 'refund')
-                    OR (transaction_type = 'transfer' AND receiver_id = :user_id)
-                )
-            """), {"user_id": user.id}).fetchone()
-            
-            expense_txns = db.session.execute(db.text("""
-                SELECT COALESCE(SUM(amount), 0) as total
-                FROM transactions
-                WHERE user_id = :user_id
-                AND (
-                    transaction_type IN ('payment', 'purchase')
-                    OR (transaction_type = 'transfer' AND sender_id = :user_id)
-                )
-            """), {"user_id": user.id}).fetchone()
+            income_total, expense_total = db.session.query(
+                func.coalesce(func.sum(inflow_amount(Transaction)), 0),
+                func.coalesce(func.sum(outflow_amount(Transaction)), 0)
+            ).filter(Transaction.user_id == user.id).one()
             
-            current_income = float(income_txns[0])
-            current_expenses = float(expense_txns[0])
+            current_income = float(income_total)
+            current_expenses = float(expense_total)
             
             # Skip users with already balanced finances
             if current_income >= current_expenses * 1.05:
@@ -1,8 +1,19 @@
 import os
+import sys
 from app import create_app
 from app.extensions import socketio
 
 app = create_app(os.getenv('FLASK_ENV', 'development'))
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True, use_reloader=False)
+    # Development server; production runs `gunicorn -c gunicorn.conf.py wsgi:app`
+    if not app.config['DEBUG']:
+        sys.exit('run.py is for development only (FLASK_ENV=development); use gunicorn -c gunicorn.conf.py wsgi:app')
+    socketio.run(
+        app,
+        host='0.0.0.0',
+        port=int(os.getenv('PORT', 8000)),
+        debug=app.config['DEBUG'],
+        use_reloader=False,
+        allow_unsafe_werkzeug=app.config['DEBUG']
+    )
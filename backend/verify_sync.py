@@ -13,29 +13,20 @@ synchronization across all views.
 
 from app import create_app
 from app.extensions import db
-from app.models import User, Transaction
+from app.models import User, Transaction, TransactionAggregate
+from app.utils.transaction_types import inflow_amount, outflow_amount
+from sqlalchemy import func
 import sys
 
 def verify_stats_consistency(user_id, username):
     """Verify stats calculation matches transaction aggregation."""
     
     # Stats calculation (used by Activity summary cards)
-    stats = db.session.execute(db.text('''
-        SELECT 
-            COUNT(*) as transaction_count,
-            SUM(CASE 
-                WHEN transaction_type IN ('topup', 'income', 'refund') THEN amount
-                WHEN transaction_type = 'transfer' AND receiver_id = :user_id THEN amount
-                ELSE 0
-            END) as total_income,
-            SUM(CASE 
-                WHEN transaction_type IN ('payment', 'purchase') THEN amount
-                WHEN transaction_type = 'transfer' AND sender_id = :user_id THEN amount
-                ELSE 0
-            END) as total_expenses
-        FROM transactions
-        WHERE user_id = :user_id
-    '''), {"user_id": user_id}).fetchone()
+    stats = db.session.query(
+        func.count(Transaction.id),
+        func.sum(inflow_amount(Transaction)),
+        func.sum(outflow_amount(Transaction))
+    ).filter(Transaction.user_id == user_id).one()
     
     # Transaction list (used by Activity page list)
     transactions = Transaction.query.filter_by(user_id=user_id).order_by(
@@ -52,8 +43,12 @@ def verify_stats_consistency(user_id, username):
         GROUP BY DATE(created_at)
     '''), {"user_id": user_id}).fetchall()
     
+    # Incrementally maintained aggregate (what /api/transactions/stats serves)
+    aggregate = db.session.get(TransactionAggregate, user_id)
+    
     return {
         "username": username,
+        "aggregate": aggregate.to_dict() if aggregate else None,
         "stats": {
             "total_transactions": stats[0],
             "total_income": float(stats[1]) if stats[1] else 0,
@@ -140,7 +135,16 @@ def main():
             ratio = result['stats']['total_income'] / result['stats']['total_expenses'] if result['stats']['total_expenses'] > 0 else 0
             print(f"   {'✅' if check4 else '❌'} Income > Expenses (ratio: {ratio:.2f}x)")
             
-            if not all([check1, check2, check3, check4]):
+            # Check 5: Stored aggregate matches a fresh scan of the raw rows
+            aggregate = result['aggregate']
+            check5 = aggregate is not None and (
+                aggregate['transaction_count'] == result['stats']['total_transactions']
+                and abs(aggregate['total_income'] - result['stats']['total_income']) < 0.005
+                and abs(aggregate['total_expenses'] - result['stats']['total_expenses']) < 0.005
+            )
+            print(f"   {'✅' if check5 else '❌'} Stored aggregate matches raw transaction totals")
+            
+            if not all([check1, check2, check3, check4, check5]):
                 all_passed = False
                 print(f"\n   ⚠️  FAILED: {username} has synchronization issues!")
             else: